@@ -0,0 +1,5 @@
+"""Benchmarks for the Messenger interpreter.
+
+benchmarks.programs has the programs, benchmarks.runner times them, and
+benchmarks.allocations counts the messages a single grid allocates.
+"""
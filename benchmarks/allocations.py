@@ -0,0 +1,66 @@
+"""Count how many MessengerMessages MessengerGrid.tick allocates.
+
+Run from the repository root with:
+    py -m benchmarks.allocations [TICKS] [HEIGHT]
+"""
+
+import sys
+
+from benchmarks.programs import splitter_grid
+from messenger.interpreter import MessengerGrid, MessengerMessage
+
+class AllocationCounter:
+    """A context manager that counts the MessengerMessages created
+    inside it.
+    """
+
+    def __init__(self):
+        """Return an AllocationCounter that hasn't counted anything."""
+        self.allocations = 0
+
+    def __enter__(self):
+        """Start counting MessengerMessages. Messages are made by
+        MessengerMessage.__init__ and MessengerMessage.clone, so both are
+        wrapped.
+        """
+        self.originalInit = MessengerMessage.__init__
+        self.originalClone = MessengerMessage.clone
+
+        def counting_init(message, *args, **kwargs):
+            self.allocations += 1
+            self.originalInit(message, *args, **kwargs)
+
+        def counting_clone(message):
+            self.allocations += 1
+            return self.originalClone(message)
+
+        MessengerMessage.__init__ = counting_init
+        MessengerMessage.clone = counting_clone
+        return self
+
+    def __exit__(self, *exception):
+        """Stop counting MessengerMessages."""
+        MessengerMessage.__init__ = self.originalInit
+        MessengerMessage.clone = self.originalClone
+
+def count_allocations(code, ticks):
+    """Run code for the given number of ticks and return the number of
+    MessengerMessages allocated and the total number of live messages
+    summed over every tick.
+    """
+    grid = MessengerGrid(code)
+    liveMessages = 0
+    with AllocationCounter() as counter:
+        for _ in range(ticks):
+            grid.tick()
+            liveMessages += len(grid.messages)
+    return counter.allocations, liveMessages
+
+if __name__ == '__main__':
+    ticks = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    height = int(sys.argv[2]) if len(sys.argv) > 2 else 400
+    allocations, liveMessages = count_allocations(splitter_grid(height),
+                                                  ticks)
+    print(f'Ticks: {ticks}')
+    print(f'Live messages per tick: {liveMessages / ticks:.1f}')
+    print(f'Allocations per tick: {allocations / ticks:.2f}')
@@ -0,0 +1,114 @@
+"""Messenger programs that each stress 1 part of the interpreter."""
+
+### PROGRAM CLASS ###
+
+class Program:
+    """A benchmark program, run for at most iterations ticks."""
+
+    def __init__(self, name, description, code, iterations, inputs=()):
+        """Return a Program that runs code with inputs given to I."""
+        self.name = name
+        self.description = description
+        self.code = code
+        self.iterations = iterations
+        self.inputs = inputs
+
+    def __repr__(self):
+        """Return a string representation of the Program."""
+        return f'<Program {self.name!r}>'
+
+### GRIDS ###
+
+def counting_grid():
+    """Return a grid that counts an INT read by I down to 0 and prints
+    the 0. Each lap of the loop splits the counter with S, subtracts 1
+    with -, and goes around W while the counter is positive.
+    """
+    return ('>0Iv\n'
+            '   v   W\n'
+            '\n'
+            ' v1S   -\n'
+            '\n'
+            ' >     ^')
+
+def splitter_grid(height):
+    """Return a grid where a message loops around an S, sending a copy
+    down a column of the given height every 4 ticks.
+    """
+    return 'v<\n>S' + '\n' * (height - 2)
+
+def list_walking_grid():
+    """Return a grid that reads a LIST and walks it from both ends:
+    B prints its first element and E drops its last element, until only
+    NULLs are left to print.
+    """
+    return ('>LIv\n'
+            '  >v\n'
+            ' E^\n'
+            ' ^ B')
+
+def _arithmetic_block(operator, digit):
+    """Return the 4 rows of a block that takes a message moving right
+    into its S and sends it out the right side, with its content
+    combined with digit by operator.
+    """
+    return ['>v  >v',
+            f'S>  {operator}>',
+            f'{digit}',
+            '>   ^']
+
+def arithmetic_grid():
+    """Return a grid that loops a message through +1, *3, -1, and /3
+    forever, so the content goes 5, 6, 18, 17, and back to 5.
+    """
+    blocks = [_arithmetic_block(operator, digit)
+              for operator, digit in (('+', 1), ('*', 3), ('-', 1),
+                                      ('/', 3))]
+    width = 3 + 6 * len(blocks)
+    rows = ['>5v', '', '', '', '', '', '']
+    for row in range(4):
+        rows[row + 1] = (rows[row + 1].ljust(3)
+                         + ''.join(block[row].ljust(6) for block in blocks))
+    rows[2] = ' >>' + rows[2][3:] + 'v'
+    rows[3] = ' ^' + rows[3][2:]
+    rows[4] = ' ^' + rows[4][2:]
+    rows[5] = ' ^'
+    rows[6] = ' ^' + '<'.rjust(width - 1)
+    return '\n'.join(row.rstrip() for row in rows)
+
+def output_grid():
+    """Return a grid that reads a LIST and prints it as a string every
+    4 ticks.
+    """
+    return ('>LIv\n'
+            '   v<\n'
+            '  vS^')
+
+def wide_grid(width, height):
+    """Return a grid that is mostly empty space, with a message going
+    around its edges forever.
+    """
+    rows = ['>' + ' ' * (width - 2) + 'v']
+    rows += [''] * (height - 2)
+    rows.append('^' + ' ' * (width - 2) + '<')
+    return '\n'.join(rows)
+
+### PROGRAMS ###
+
+_TEXT = [ord(char)
+         for char in 'The quick brown fox jumps over the lazy dog.\n']
+
+PROGRAMS = {program.name: program for program in (
+    Program('counting-loop', 'count down from 2500 through - and W',
+            counting_grid(), 60000, [2500]),
+    Program('splitter-explosion', 'an S sending copies down a long column',
+            splitter_grid(400), 20000),
+    Program('list-walking', 'walk a 5000-element LIST with B and E',
+            list_walking_grid(), 25000, [list(range(5000))]),
+    Program('arithmetic', 'loop through +1, *3, -1, and /3',
+            arithmetic_grid(), 50000),
+    Program('output-heavy', 'print a 450-character LIST every 4 ticks',
+            output_grid(), 20000, [_TEXT * 10]),
+    Program('wide-sparse', 'go around the edges of a 20000x50 grid',
+            wide_grid(20000, 50), 100000),
+)}
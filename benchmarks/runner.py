@@ -0,0 +1,183 @@
+"""Time the benchmark programs and compare them with a saved baseline.
+
+Run from the repository root with:
+    py -m benchmarks.runner [NAME ...] [-e ENGINE] [-r REPEAT]
+                            [--save FILE] [--compare FILE]
+"""
+
+import argparse
+import json
+import platform
+import time
+import tracemalloc
+
+from benchmarks.allocations import AllocationCounter
+from benchmarks.programs import PROGRAMS
+from messenger.interpreter import IterationLimitError, MessengerGrid
+from messenger.output import CaptureSink
+
+### MEASURING ###
+
+def time_program(program, engine='tick', repeat=3):
+    """Run program repeat times with MessengerGrid.run and return the
+    number of ticks it ran for and the fastest time in seconds.
+    """
+    best = None
+    for _ in range(repeat):
+        grid = MessengerGrid(program.code, output=CaptureSink(),
+                             inputs=program.inputs)
+        start = time.perf_counter()
+        try:
+            grid.run(program.iterations, engine)
+        except IterationLimitError:
+            pass
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return grid.tickNumber, best
+
+def _watch_messages(grid, peak):
+    """Make grid.tick keep the most messages alive after any tick in
+    peak[0].
+    """
+    originalTick = grid.tick
+
+    def tick():
+        originalTick()
+        peak[0] = max(peak[0],
+                      len(grid.movingMessages) + len(grid.occupancy))
+
+    grid.tick = tick
+
+def measure_program(program, engine='tick'):
+    """Run program with engine and return the most messages alive at
+    once, the number of MessengerMessages allocated, and the peak memory
+    in bytes allocated while it ran. The messages alive don't depend on
+    the engine, so they are always counted 1 tick at a time, with
+    another run if engine isn't 'tick'.
+    """
+    grid = MessengerGrid(program.code, output=CaptureSink(),
+                         inputs=program.inputs)
+    peak = [len(grid.messages)]
+    if engine == 'tick':
+        _watch_messages(grid, peak)
+    tracemalloc.start()
+    try:
+        startMemory = tracemalloc.get_traced_memory()[0]
+        with AllocationCounter() as counter:
+            try:
+                grid.run(program.iterations, engine)
+            except IterationLimitError:
+                pass
+        peakMemory = tracemalloc.get_traced_memory()[1] - startMemory
+    finally:
+        tracemalloc.stop()
+    if engine != 'tick':
+        grid = MessengerGrid(program.code, output=CaptureSink(),
+                             inputs=program.inputs)
+        _watch_messages(grid, peak)
+        try:
+            grid.run(program.iterations)
+        except IterationLimitError:
+            pass
+    return peak[0], counter.allocations, peakMemory
+
+def run_benchmarks(names=None, engine='tick', repeat=3):
+    """Run the programs called names (or all of them) and return a
+    dictionary of their results by name.
+    """
+    results = {}
+    for name in names or PROGRAMS:
+        program = PROGRAMS[name]
+        ticks, seconds = time_program(program, engine, repeat)
+        peakMessages, allocations, peakMemory = measure_program(
+            program, engine
+        )
+        results[name] = {'ticks': ticks,
+                         'seconds': seconds,
+                         'ticksPerSecond': ticks / seconds,
+                         'peakMessages': peakMessages,
+                         'allocations': allocations,
+                         'peakMemory': peakMemory}
+    return results
+
+### REPORTING ###
+
+def _change(new, old):
+    """Return how much new changed from old as a percentage string."""
+    if not old:
+        return '-'
+    return f'{(new - old) / old * 100:+.1f}%'
+
+def report(results, baseline=None):
+    """Return a table of results, compared with baseline if it is
+    given.
+    """
+    header = (f'{"program":<20}{"ticks":>9}{"ticks/sec":>13}'
+              f'{"peak msgs":>11}{"allocs":>10}{"peak mem":>12}')
+    if baseline is not None:
+        header += f'{"speed":>10}{"memory":>10}'
+    lines = [header, '-' * len(header)]
+    for name, result in results.items():
+        line = (f'{name:<20}{result["ticks"]:>9}'
+                f'{result["ticksPerSecond"]:>13,.0f}'
+                f'{result["peakMessages"]:>11}{result["allocations"]:>10}'
+                f'{result["peakMemory"] / 1024:>10,.0f}KB')
+        if baseline is not None:
+            old = baseline.get(name)
+            if old is None:
+                line += f'{"new":>10}{"":>10}'
+            else:
+                speed = _change(result['ticksPerSecond'],
+                                old['ticksPerSecond'])
+                memory = _change(result['peakMemory'], old['peakMemory'])
+                line += f'{speed:>10}{memory:>10}'
+        lines.append(line)
+    return '\n'.join(lines)
+
+def main(argv=None):
+    """Run the benchmarks from the command line."""
+    parser = argparse.ArgumentParser(
+        prog='py -m benchmarks.runner',
+        description='Times the Messenger benchmark programs.'
+    )
+    parser.add_argument('names',
+                        help='the programs to run (DEFAULT: all of them): '
+                             + ', '.join(PROGRAMS),
+                        metavar='NAME',
+                        nargs='*')
+    parser.add_argument('-e', '--engine',
+                        help='the engine to time (DEFAULT: tick)',
+                        choices=['tick', 'event', 'numpy'],
+                        default='tick')
+    parser.add_argument('-r', '--repeat',
+                        help='times each program N times and keeps the '
+                             'fastest (DEFAULT: 3)',
+                        metavar='N',
+                        type=int,
+                        default=3)
+    parser.add_argument('--save',
+                        help='saves the results to FILE as a baseline',
+                        metavar='FILE')
+    parser.add_argument('--compare',
+                        help='compares the results with the baseline in FILE',
+                        metavar='FILE')
+    arguments = parser.parse_args(argv)
+    for name in arguments.names:
+        if name not in PROGRAMS:
+            parser.error(f'unknown program ({repr(name)})')
+
+    baseline = None
+    if arguments.compare:
+        with open(arguments.compare) as file:
+            baseline = json.load(file)['results']
+    results = run_benchmarks(arguments.names, arguments.engine,
+                             arguments.repeat)
+    print(report(results, baseline))
+    if arguments.save:
+        with open(arguments.save, 'w') as file:
+            json.dump({'engine': arguments.engine,
+                       'python': platform.python_version(),
+                       'results': results}, file, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,5 @@
+"""Run Messenger code with `python -m messenger`."""
+
+from messenger.cli import main
+
+main()
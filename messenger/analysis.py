@@ -0,0 +1,186 @@
+"""Static analysis of Messenger code, done without running it.
+
+Where a message goes only depends on the cells it lands on, except at W,
+whose turn depends on the content. Following every direction a message
+could leave each cell by, starting from the top-left corner, finds every
+cell any message can ever land on. Everything else is dead code.
+
+This also answers two questions without running anything: whether the
+code can ever print (no message can reach the right or bottom edge), and
+whether it is a single message that ends up going around redirectors
+forever, after passing through nothing but N, L, and digits on the way.
+"""
+
+from messenger.interpreter import (ARROW_DIRECTIONS, OP_SPACE, OP_UP,
+                                   OP_LEFT, OP_RANDOM, OP_WHILE, OP_NULL,
+                                   OP_LIST, OP_DIGIT, OP_SPLIT, OP_END,
+                                   OP_VANISH, OP_PRINT_RIGHT,
+                                   OP_PRINT_BOTTOM)
+from messenger.lists import MessengerList
+
+def _exits(opcode, direction):
+    """Return the directions a message arriving at a cell with opcode
+    going in direction can leave it in.
+    """
+    if OP_UP <= opcode <= OP_LEFT: # Redirectors
+        return (opcode - OP_UP,)
+    elif (opcode in (OP_RANDOM, OP_WHILE)
+          or OP_SPLIT <= opcode <= OP_END): # Either way, or both ways
+        return ((direction - 1) % 4, (direction + 1) % 4)
+    elif opcode >= OP_VANISH: # Off the grid
+        return ()
+    else: # Including +-*/=G, which let their 2nd message carry on
+        return (direction,)
+
+EXITS = tuple(tuple(_exits(opcode, direction) for direction in range(4))
+              for opcode in range(OP_PRINT_BOTTOM + 1))
+# Opcodes a message always leaves the same way without running anything
+# that can fail or be different next time
+STRAIGHT = frozenset(range(OP_UP, OP_LEFT + 1)) | frozenset(
+    (OP_NULL, OP_LIST) + tuple(range(OP_DIGIT, OP_DIGIT + 10))
+)
+
+### ANALYSIS CLASS ###
+
+class Analysis:
+    """What can happen when a MessengerGrid runs from the start.
+    opcodes is the set of opcodes messages can land on, canOutput is
+    False if nothing can ever be printed, and loop is (startTick, length)
+    if the code is a single message that ends up going around a ring of
+    redirectors forever, or None. cells is the set of indexes in
+    MessengerGrid.opcodes of the cells other than ' ' that messages can
+    land on, or None if it isn't known, such as when the Analysis came
+    from messenger.cache.
+    """
+
+    def __init__(self, opcodes, canOutput, loop=None, cells=None):
+        """Return an Analysis."""
+        self.opcodes = frozenset(opcodes)
+        self.canOutput = canOutput
+        self.loop = loop
+        self.cells = cells
+
+    def __repr__(self):
+        """Return a string representation of the Analysis."""
+        return (f'<Analysis: canOutput={self.canOutput}, '
+                f'loop={self.loop}>')
+
+### ANALYSING ###
+
+def start_state(grid):
+    """Return the state of the message grid starts with, as its index in
+    MessengerGrid.opcodes times 4 plus its direction.
+    """
+    return (grid.stride + 1) * 4 + ARROW_DIRECTIONS[grid[0, 0]]
+
+def at_start(grid):
+    """Return True if grid hasn't moved since it was reset, which is the
+    only time its Analysis says where its messages can go.
+    """
+    if len(grid.movingMessages) != 1 or grid.occupancy:
+        return False
+    m = grid.movingMessages[0]
+    return ((m.x, m.y, m.dir, m.content)
+            == (0, 0, ARROW_DIRECTIONS[grid[0, 0]], None))
+
+def analyse(grid):
+    """Return the Analysis of grid.
+    States are only kept for cells other than ' ', since a message
+    crossing ' ' always carries on the same way.
+    """
+    opcodes = grid.opcodes
+    stride = grid.stride
+    steps = (-stride, 1, stride, -1)
+    state = start_state(grid)
+    seen = {state}
+    stack = [state]
+    cells = {state // 4}
+    reached = {opcodes[state // 4]}
+    while stack:
+        index, direction = divmod(stack.pop(), 4)
+        step = steps[direction]
+        index += step
+        opcode = opcodes[index]
+        while opcode == OP_SPACE:
+            index += step
+            opcode = opcodes[index]
+        reached.add(opcode)
+        if opcode < OP_VANISH:
+            cells.add(index)
+        for newDirection in EXITS[opcode][direction]:
+            state = index * 4 + newDirection
+            if state not in seen:
+                seen.add(state)
+                stack.append(state)
+
+    canOutput = OP_PRINT_RIGHT in reached or OP_PRINT_BOTTOM in reached
+    loop = None
+    if reached <= STRAIGHT: # 1 message on 1 path, which has to repeat
+        path, startTick = trace_loop(grid)
+        if path is not None:
+            loop = (startTick, len(path) - startTick)
+    return Analysis(reached - {OP_VANISH, OP_PRINT_RIGHT, OP_PRINT_BOTTOM},
+                    canOutput, loop, frozenset(cells))
+
+def trace_loop(grid):
+    """Follow the only message of grid, which can only reach the
+    opcodes in STRAIGHT, and return the list of (state, content) it is
+    in after each tick, starting from tick 0, until it repeats itself,
+    along with the tick the loop starts on. Return (None, None) if it
+    never repeats, because an L in its loop keeps wrapping the content.
+    """
+    opcodes = grid.opcodes
+    stride = grid.stride
+    steps = (-stride, 1, stride, -1)
+    state = start_state(grid)
+    ticks = {} # State: tick it was first in
+    states = []
+    while state not in ticks:
+        ticks[state] = len(states)
+        states.append(state)
+        index, direction = divmod(state, 4)
+        index += steps[direction]
+        opcode = opcodes[index]
+        if OP_UP <= opcode <= OP_LEFT:
+            direction = opcode - OP_UP
+        state = index * 4 + direction
+    startTick = ticks[state]
+    length = len(states) - startTick
+    if any(opcodes[state // 4] == OP_LIST for state in states[startTick:]):
+        return None, None
+
+    # The position repeats from startTick on, but the content only does
+    # once the message has been through every N and digit in the loop
+    content = None
+    path = [(states[0], content)]
+    for tick in range(1, startTick + 2 * length + 1):
+        state = (states[tick] if tick < len(states)
+                 else states[startTick + (tick - startTick) % length])
+        opcode = opcodes[state // 4]
+        if opcode == OP_NULL:
+            content = None
+        elif opcode == OP_LIST:
+            content = MessengerList((content,))
+        elif opcode >= OP_DIGIT:
+            content = opcode - OP_DIGIT
+        path.append((state, content))
+    startTick = next(tick for tick in range(startTick, len(path))
+                     if path[tick] == path[tick + length])
+    return path[:startTick + length], startTick
+
+def dead_cells(grid):
+    """Return a list of the (x, y) positions of the cells of grid other
+    than ' ' that no message can ever land on, from top to bottom.
+    """
+    cells = grid.analysis.cells
+    if cells is None:
+        cells = analyse(grid).cells
+    stride = grid.stride
+    if grid.sparse:
+        indexes = sorted(grid.opcodes)
+    else: # Find the opcodes from OP_SPACE + 1 to OP_VANISH - 1
+        import re
+        indexes = [cell.start() for cell
+                   in re.finditer(rb'[\x01-\x1d]', grid.opcodes)]
+    return [(index % stride - 1, index // stride - 1) for index in indexes
+            if index not in cells]
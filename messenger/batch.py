@@ -0,0 +1,319 @@
+"""Run many Messenger programs, or 1 program with many inputs, at once.
+
+Jobs are spread across worker processes and the results are written as
+JSON lines in the same order as the jobs, as soon as each one is ready.
+A job that is still running HARD_LIMIT_GRACE seconds after its time limit
+(because it is stuck in a single long tick) has its worker killed, and a
+job whose worker dies is reported as a crash. Either way, the worker is
+replaced and the rest of the jobs carry on.
+Run it with `python -m messenger.batch SOURCE`, where SOURCE is a
+directory of programs, a .jsonl file of jobs, or a single program to be
+run with every input vector in --inputs.
+"""
+
+import argparse
+import json
+import multiprocessing
+import multiprocessing.connection
+import os
+import pathlib
+import sys
+import time
+
+from messenger.inputs import QueueInput
+from messenger.interpreter import (InfiniteLoopError, IterationLimitError,
+                                   MessengerGrid)
+from messenger.output import CaptureSink
+
+# How many seconds a job can run over its time limit before it is killed
+HARD_LIMIT_GRACE = 2.0
+
+### JOBS ###
+
+def jobs_from_directory(path, pattern='*'):
+    """Yield a job for every file in the directory path whose name
+    matches pattern, with the file's path relative to path as its id.
+    """
+    root = pathlib.Path(path)
+    for file in sorted(root.rglob(pattern)):
+        if file.is_file() and not file.name.startswith('.'):
+            yield {'id': file.relative_to(root).as_posix(),
+                   'code': file.read_text()}
+
+def jobs_from_jsonl(path):
+    """Yield a job for every line of the JSONL file path.
+    Each line is an object with a 'code' key, and optionally 'id',
+    'inputs', 'iterations', 'timeLimit', 'engine', and 'detectCycles'
+    keys. Jobs without an id are numbered by line.
+    """
+    with open(path) as file:
+        for lineNumber, line in enumerate(file, 1):
+            if line.strip():
+                job = json.loads(line)
+                job.setdefault('id', lineNumber)
+                yield job
+
+def jobs_from_inputs(code, path):
+    """Yield a job running code for every line of the JSONL file path,
+    each of which is a JSON array of the values to give I in order.
+    """
+    with open(path) as file:
+        for lineNumber, line in enumerate(file, 1):
+            if line.strip():
+                yield {'id': lineNumber, 'code': code,
+                       'inputs': json.loads(line)}
+
+### RUNNING JOBS ###
+
+def run_job(job, iterations=50000, timeLimit=None, engine='tick',
+            detectCycles=False):
+    """Run a single job and return its result as a dictionary.
+    The limits and engine of the job override the ones given here.
+    The result's 'reason' is 'halted', 'iteration-limit', 'timeout',
+    'infinite-loop', or 'error'. run_batch can also give 'crash'.
+    """
+    output = CaptureSink()
+    grid = None
+    error = None
+    try:
+        grid = MessengerGrid(job['code'], output=output,
+                             inputs=QueueInput(job.get('inputs') or ()))
+        grid.run(job.get('iterations', iterations),
+                 job.get('engine', engine),
+                 job.get('detectCycles', detectCycles),
+                 timeLimit=job.get('timeLimit', timeLimit))
+        reason = 'halted'
+    except IterationLimitError as e:
+        reason, error = 'iteration-limit', e
+    except TimeoutError as e:
+        reason, error = 'timeout', e
+    except InfiniteLoopError as e:
+        reason, error = 'infinite-loop', e
+    except Exception as e:
+        reason, error = 'error', e
+    return {'id': job.get('id'),
+            'output': output.getvalue(),
+            'ticks': grid.tickNumber if grid is not None else 0,
+            'reason': reason,
+            'error': f'{type(error).__name__}: {error}' if error else None}
+
+def _failed(job, reason, error):
+    """Return the result of a job that was killed or whose worker died,
+    which has no output and an unknown number of ticks.
+    """
+    return {'id': job.get('id'), 'output': '', 'ticks': None,
+            'reason': reason, 'error': error}
+
+def _work(connection, runner, settings):
+    """Run the jobs sent down connection with runner in a worker process
+    and send back their results, until None is sent.
+    """
+    while (job := connection.recv()) is not None:
+        connection.send(runner(job, **settings))
+
+class _Worker:
+    """A worker process and the job it is running."""
+
+    def __init__(self, runner, settings):
+        """Start a worker process that runs jobs with runner and
+        settings.
+        """
+        self.connection, workerConnection = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(
+            target=_work, args=(workerConnection, runner, settings),
+            daemon=True
+        )
+        self.process.start()
+        workerConnection.close()
+        self.job = None
+        self.index = None
+        self.deadline = None
+
+    def start(self, index, job, timeLimit):
+        """Send the worker job, which is job number index."""
+        self.job = job
+        self.index = index
+        limit = job.get('timeLimit', timeLimit)
+        self.deadline = (time.monotonic() + limit + HARD_LIMIT_GRACE
+                         if limit else None)
+        self.connection.send(job)
+
+    def finish(self):
+        """Return the result of the worker's job, or a 'crash' result if
+        the worker died.
+        """
+        job = self.job
+        self.job = None
+        try:
+            return self.connection.recv()
+        except (EOFError, OSError):
+            self.process.join()
+            return _failed(job, 'crash', f'Worker exited with code '
+                                         f'{self.process.exitcode}')
+
+    def kill(self):
+        """Kill the worker process."""
+        self.process.kill()
+        self.process.join()
+        self.connection.close()
+
+    def stop(self):
+        """Ask the worker process to stop once it is idle."""
+        try:
+            self.connection.send(None)
+        except OSError: # It already died
+            pass
+        self.process.join()
+        self.connection.close()
+
+def run_batch(jobs, workers=None, runner=run_job, **settings):
+    """Run jobs across workers processes and yield their results in
+    order. Each job is run by runner, which is run_job unless it is
+    replaced by another module-level function that takes the same
+    arguments, and settings are passed on to it. If workers is 0, the
+    jobs are run in this process, so nothing stops a job stuck in a
+    single tick, and a crash stops the whole batch.
+    Only a few jobs per worker are read ahead at a time, so jobs can come
+    from a generator too large to hold in memory.
+    """
+    if workers == 0:
+        for job in jobs:
+            yield runner(job, **settings)
+        return
+    workers = workers or os.cpu_count() or 1
+    timeLimit = settings.get('timeLimit')
+    jobs = enumerate(jobs)
+    pool = [_Worker(runner, settings) for _ in range(workers)]
+    finished = {} # Results by job number, until they can be yielded
+    nextIndex = 0 # The job number whose result is yielded next
+    started = 0
+    exhausted = False
+    try:
+        while True:
+            # Give every idle worker a job
+            for worker in pool:
+                if (worker.job is None and not exhausted
+                    and started - nextIndex < 4 * workers):
+                    job = next(jobs, None)
+                    if job is None:
+                        exhausted = True
+                    else:
+                        worker.start(*job, timeLimit)
+                        started += 1
+            busy = [worker for worker in pool if worker.job is not None]
+            if not busy:
+                break
+
+            # Wait for a result, or for the first deadline
+            deadlines = [worker.deadline for worker in busy
+                         if worker.deadline is not None]
+            timeout = (max(0, min(deadlines) - time.monotonic())
+                       if deadlines else None)
+            ready = multiprocessing.connection.wait(
+                [worker.connection for worker in busy], timeout
+            )
+            now = time.monotonic()
+            for i, worker in enumerate(pool):
+                if worker.job is None:
+                    continue
+                if worker.connection in ready:
+                    index = worker.index
+                    finished[index] = worker.finish()
+                    if not worker.process.is_alive(): # It crashed
+                        worker.kill()
+                        pool[i] = _Worker(runner, settings)
+                elif worker.deadline is not None and now >= worker.deadline:
+                    finished[worker.index] = _failed(
+                        worker.job, 'timeout',
+                        f'TimeoutError: Killed after running '
+                        f'{HARD_LIMIT_GRACE} seconds over the time limit'
+                    )
+                    worker.kill()
+                    pool[i] = _Worker(runner, settings)
+
+            while nextIndex in finished:
+                yield finished.pop(nextIndex)
+                nextIndex += 1
+    finally:
+        for worker in pool:
+            if worker.job is None:
+                worker.stop()
+            else:
+                worker.kill()
+
+### COMMAND LINE ###
+
+def main(argv=None):
+    """Run the batch runner from the command line."""
+    formatter = lambda prog: argparse.HelpFormatter(prog, max_help_position=30)
+    parser = argparse.ArgumentParser(
+        prog='python -m messenger.batch',
+        description='Runs many Messenger programs at once and writes the '
+                    'results as JSON lines.',
+        formatter_class=formatter
+    )
+    parser.add_argument('source',
+                        help='a directory of programs, a .jsonl file of '
+                             'jobs, or a program to run with --inputs')
+    parser.add_argument('--inputs',
+                        help='runs the program once for every JSON array '
+                             'of inputs in FILE',
+                        metavar='FILE')
+    parser.add_argument('-p', '--pattern',
+                        help='only runs files in the directory matching '
+                             'PATTERN (DEFAULT: *)',
+                        default='*')
+    parser.add_argument('-i', '--iterations',
+                        help='stops each job after ITER iterations; '
+                             '0 = never (DEFAULT: 50000)',
+                        metavar='ITER',
+                        type=int,
+                        default=50000)
+    parser.add_argument('-t', '--time-limit',
+                        help='stops each job after SECONDS seconds',
+                        metavar='SECONDS',
+                        type=float)
+    parser.add_argument('-e', '--engine',
+                        help='the engine to run the jobs with '
+                             '(DEFAULT: tick)',
+                        choices=['tick', 'event', 'numpy'],
+                        default='tick')
+    parser.add_argument('-l', '--detect-loops',
+                        help='stops jobs that loop forever without printing',
+                        action='store_true')
+    parser.add_argument('-j', '--jobs',
+                        help='runs N jobs at once; 0 = 1 at a time in this '
+                             'process (DEFAULT: 1 per CPU)',
+                        metavar='N',
+                        type=int)
+    parser.add_argument('-o', '--output',
+                        help='writes the results to FILE (DEFAULT: stdout)',
+                        metavar='FILE')
+    arguments = parser.parse_args(argv)
+
+    if arguments.inputs is not None:
+        with open(arguments.source) as file:
+            jobs = jobs_from_inputs(file.read(), arguments.inputs)
+    elif os.path.isdir(arguments.source):
+        jobs = jobs_from_directory(arguments.source, arguments.pattern)
+    elif arguments.source.endswith('.jsonl'):
+        jobs = jobs_from_jsonl(arguments.source)
+    else:
+        with open(arguments.source) as file:
+            jobs = [{'id': arguments.source, 'code': file.read()}]
+
+    results = open(arguments.output, 'w') if arguments.output else sys.stdout
+    try:
+        for result in run_batch(jobs, arguments.jobs,
+                                iterations=arguments.iterations,
+                                timeLimit=arguments.time_limit,
+                                engine=arguments.engine,
+                                detectCycles=arguments.detect_loops):
+            results.write(json.dumps(result) + '\n')
+            results.flush()
+    finally:
+        if results is not sys.stdout:
+            results.close()
+
+if __name__ == '__main__':
+    main()
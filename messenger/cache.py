@@ -0,0 +1,234 @@
+"""An on-disk cache of compiled Messenger grids.
+
+Compiling a grid means checking every character, splitting it into lines,
+and padding them, which is most of the time a short program takes to run
+from the command line. The compiled opcodes, and what messenger.analysis
+found out about them, are saved in a small binary file named after the
+SHA-256 hash of the code, so running the same code again only has to
+read them back.
+
+Small programs compile faster than the cache can be checked, so only
+code of at least CACHE_MIN_SIZE bytes is cached, and the modules only
+needed for the cache are imported when it is used.
+
+The cache is kept in $MESSENGER_CACHE_DIR if it is set, and otherwise in
+messenger/ under $XDG_CACHE_HOME or ~/.cache. A cache file that can't be
+read is ignored, and the code is compiled again.
+"""
+
+import mmap
+import os
+import struct
+import sys
+import zlib
+
+from messenger.interpreter import MessengerGrid, SparseOpcodes
+
+# Every cache file starts with this, and the version of the format.
+# Changing anything in the format means increasing FORMAT_VERSION.
+MAGIC = b'MSGC'
+FORMAT_VERSION = 3
+# Width, height, whether the opcodes are sparse, a bit for each opcode in
+# the code, and the grid's Analysis if it was known: a bit for each opcode
+# messages can reach, whether it can print and has a loop, and where the
+# loop is. The compressed opcodes come after it.
+_HEADER = struct.Struct('<4sHIIBQQBQQ')
+_CAN_OUTPUT = 1
+_HAS_LOOP = 2
+_HAS_ANALYSIS = 4
+# Opcodes compress well even at the fastest level, and saving a huge grid
+# shouldn't take longer than compiling it again
+COMPRESSION_LEVEL = 1
+# Code smaller than this many bytes is compiled without using the cache
+CACHE_MIN_SIZE = 1 << 17
+
+### PATHS ###
+
+def cache_directory():
+    """Return the directory the cache is kept in."""
+    if directory := os.environ.get('MESSENGER_CACHE_DIR'):
+        return directory
+    base = (os.environ.get('XDG_CACHE_HOME')
+            or os.path.join(os.path.expanduser('~'), '.cache'))
+    return os.path.join(base, 'messenger')
+
+def cache_key(code, sparse=None):
+    """Return the key the compiled form of code is stored under. code is
+    the source as bytes or anything else with the buffer protocol, and
+    sparse is passed to MessengerGrid the same way.
+    """
+    import hashlib
+
+    digest = hashlib.sha256(f'{FORMAT_VERSION}:{sparse}:'.encode())
+    digest.update(code)
+    return digest.hexdigest()
+
+def _path(key, directory):
+    """Return the path of the cache file for key."""
+    return os.path.join(directory or cache_directory(), f'{key}.msgc')
+
+### READING AND WRITING ###
+
+def _mask(opcodes):
+    """Return an int with a bit set for each opcode in opcodes."""
+    return sum(1 << opcode for opcode in opcodes)
+
+def _unmask(mask):
+    """Return a list of the opcodes whose bits are set in mask."""
+    return [opcode for opcode in range(mask.bit_length())
+            if mask >> opcode & 1]
+
+def dump(grid):
+    """Return the compiled form of grid as bytes. Its Analysis is only
+    included if it has already been worked out.
+    """
+    analysis = grid._analysis
+    if analysis is None:
+        flags = reachedMask = loopStart = loopLength = 0
+    else:
+        flags = (_HAS_ANALYSIS
+                 | (_CAN_OUTPUT if analysis.canOutput else 0)
+                 | (_HAS_LOOP if analysis.loop is not None else 0))
+        reachedMask = _mask(analysis.opcodes)
+        loopStart, loopLength = analysis.loop or (0, 0)
+    header = _HEADER.pack(MAGIC, FORMAT_VERSION, grid.width, grid.height,
+                          grid.sparse, _mask(grid.opcodeSet), reachedMask,
+                          flags, loopStart, loopLength)
+    if grid.sparse:
+        import array
+
+        indexes = array.array('Q', sorted(grid.opcodes))
+        opcodes = bytes(grid.opcodes[index] for index in indexes)
+        if sys.byteorder == 'big':
+            indexes.byteswap()
+        payload = indexes.tobytes() + opcodes
+    else:
+        payload = grid.opcodes
+    return header + zlib.compress(payload, COMPRESSION_LEVEL)
+
+def load(data, output=None, inputs=None):
+    """Return a MessengerGrid of the compiled form in data, which was
+    returned by dump. output and inputs are passed to MessengerGrid.
+    Raise ValueError if data isn't a compiled grid.
+    """
+    try:
+        (magic, version, width, height, sparse, opcodeMask, reachedMask,
+         flags, loopStart, loopLength) = _HEADER.unpack_from(data)
+        payload = zlib.decompress(data[_HEADER.size:])
+    except (struct.error, zlib.error) as error:
+        raise ValueError(f'Invalid compiled grid ({error})') from None
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise ValueError('Invalid compiled grid (wrong format)')
+    stride = width + 2
+    if sparse:
+        if len(payload) % 9:
+            raise ValueError('Invalid compiled grid (wrong size)')
+        count = len(payload) // 9
+        import array
+
+        indexes = array.array('Q', payload[:8 * count])
+        if sys.byteorder == 'big':
+            indexes.byteswap()
+        opcodes = SparseOpcodes(stride, height)
+        opcodes.update(zip(indexes, payload[8 * count:]))
+    else:
+        if len(payload) != stride * (height + 2):
+            raise ValueError('Invalid compiled grid (wrong size)')
+        opcodes = payload
+    analysis = None
+    if flags & _HAS_ANALYSIS:
+        from messenger.analysis import Analysis
+        analysis = Analysis(_unmask(reachedMask), bool(flags & _CAN_OUTPUT),
+                            (loopStart, loopLength) if flags & _HAS_LOOP
+                            else None)
+    return MessengerGrid.from_compiled(width, height, opcodes, output, inputs,
+                                       _unmask(opcodeMask), analysis)
+
+def store(key, grid, directory=None):
+    """Save the compiled form of grid under key, along with its
+    Analysis, which is worked out first if it isn't known yet. The file
+    is written somewhere else first, so other processes never see half
+    of it. Errors are ignored, since the cache is only there to save
+    time.
+    """
+    import tempfile
+
+    grid.analysis # Only big code is stored, so this is cheap in comparison
+    path = _path(key, directory)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temporaryPath = tempfile.mkstemp(dir=os.path.dirname(path),
+                                             suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                file.write(dump(grid))
+            os.replace(temporaryPath, path)
+        except BaseException:
+            os.unlink(temporaryPath)
+            raise
+    except OSError:
+        pass
+
+def fetch(key, output=None, inputs=None, directory=None):
+    """Return the MessengerGrid saved under key, or None if it isn't in
+    the cache.
+    """
+    try:
+        with open(_path(key, directory), 'rb') as file:
+            data = file.read()
+        return load(data, output, inputs)
+    except (OSError, ValueError):
+        return None
+
+def clear(directory=None):
+    """Delete every file in the cache and return how many there were."""
+    directory = directory or cache_directory()
+    deleted = 0
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return 0
+    for name in names:
+        if name.endswith('.msgc'):
+            os.unlink(os.path.join(directory, name))
+            deleted += 1
+    return deleted
+
+### CACHED GRIDS ###
+
+def cached_grid(code, output=None, inputs=None, sparse=None,
+                directory=None):
+    """Return MessengerGrid(code, output, inputs, sparse), compiling code
+    only if it isn't in the cache yet. Code smaller than CACHE_MIN_SIZE
+    is always compiled.
+    """
+    if len(code) < CACHE_MIN_SIZE:
+        return MessengerGrid(code, output, inputs, sparse)
+    key = cache_key(code.encode('utf-8'), sparse)
+    if (grid := fetch(key, output, inputs, directory)) is None:
+        grid = MessengerGrid(code, output, inputs, sparse)
+        store(key, grid, directory)
+    return grid
+
+def cached_file(path, output=None, inputs=None, sparse=None,
+                directory=None):
+    """Return MessengerGrid.from_file(path, output, inputs, sparse),
+    compiling the file only if it isn't in the cache yet. Files smaller
+    than CACHE_MIN_SIZE are always compiled.
+    """
+    with open(path, 'rb') as file:
+        try:
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError): # Empty, or not a regular file
+            data = file.read()
+        try:
+            if len(data) < CACHE_MIN_SIZE:
+                return MessengerGrid.from_bytes(data, output, inputs, sparse)
+            key = cache_key(data, sparse)
+            if (grid := fetch(key, output, inputs, directory)) is None:
+                grid = MessengerGrid.from_bytes(data, output, inputs, sparse)
+                store(key, grid, directory)
+            return grid
+        finally:
+            if isinstance(data, mmap.mmap):
+                data.close()
@@ -0,0 +1,142 @@
+"""The command-line interface of the Messenger interpreter.
+
+It is only imported when Messenger is run from the command line, so
+importing messenger from Python doesn't have to load argparse.
+"""
+
+import argparse
+
+from messenger.interpreter import IterationLimitError, MessengerGrid
+
+def main(argv=None):
+    """Run Messenger code from the command line."""
+    formatter = lambda prog: argparse.HelpFormatter(prog, max_help_position=30)
+    parser = argparse.ArgumentParser(
+        prog='Messenger Interpreter v1.0.2',
+        description='Runs Messenger, a 2D programming language designed to be '
+                    'as annoying as possible.',
+        formatter_class=formatter
+    )
+    parser.add_argument('code',
+                        help='The Messenger code to be run.',
+                        type=str,
+                        nargs='?')
+    parser.add_argument('-f', '--file',
+                        help='runs the code in FILE instead, without '
+                             'reading it all into memory',
+                        metavar='FILE')
+    parser.add_argument('-c', '--check',
+                        help='show grid and flags before running code',
+                        action='store_true')
+    parser.add_argument('-i', '--iterations',
+                        help='runs for ITER iterations; 0 = runs forever '
+                             '(DEFAULT: 50000)',
+                        metavar='ITER',
+                        type=int,
+                        default=50000)
+    parser.add_argument('-e', '--engine',
+                        help='"tick" moves messages 1 unit at a time; '
+                             '"event" skips them to the next cell that '
+                             'does something; "numpy" moves them all at '
+                             'once (DEFAULT: tick)',
+                        choices=['tick', 'event', 'numpy'],
+                        default='tick')
+    parser.add_argument('-l', '--detect-loops',
+                        help='stop as soon as the code loops forever without '
+                             'printing (only with the tick engine)',
+                        action='store_true')
+    parser.add_argument('--input',
+                        help='reads input from FILE, 1 value per line, '
+                             'instead of asking for it; - = stdin',
+                        metavar='FILE',
+                        type=argparse.FileType('r'))
+    parser.add_argument('--no-cache',
+                        help="compiles the code even if it's in the cache, "
+                             "and doesn't save it there",
+                        action='store_true')
+    parser.add_argument('--profile',
+                        help='saves where the ticks went to FILE as JSON '
+                             '(only with the tick engine)',
+                        metavar='FILE')
+    parser.add_argument('--trace',
+                        help='records everything that happens to FILE so '
+                             'it can be replayed (only with the tick engine)',
+                        metavar='FILE')
+    parser.add_argument('--seed',
+                        help='seeds R with SEED when tracing '
+                             '(DEFAULT: random)',
+                        metavar='SEED',
+                        type=int)
+    arguments = parser.parse_args(argv)
+    if (arguments.code is None) == (arguments.file is None):
+        parser.error('give either the code or -f/--file, but not both')
+    if arguments.profile and arguments.trace:
+        parser.error("--profile and --trace can't be used together")
+    for option, value in (('--profile', arguments.profile),
+                          ('--trace', arguments.trace)):
+        if value and arguments.engine != 'tick':
+            parser.error(f'{option} only works with the tick engine')
+        if value and arguments.detect_loops:
+            parser.error(f"{option} can't be used with -l/--detect-loops")
+    
+    if arguments.no_cache:
+        if arguments.file is not None:
+            grid = MessengerGrid.from_file(arguments.file,
+                                           inputs=arguments.input)
+        else:
+            grid = MessengerGrid(arguments.code, inputs=arguments.input)
+    else:
+        from messenger.cache import cached_file, cached_grid
+        if arguments.file is not None:
+            grid = cached_file(arguments.file, inputs=arguments.input)
+        else:
+            grid = cached_grid(arguments.code, inputs=arguments.input)
+    if arguments.check:
+        from messenger.analysis import dead_cells
+        print(f'\nGrid:\n{grid}\n')
+        print(f'Analysis:\n'
+              f'Can print: {"yes" if grid.can_print() else "no"}\n'
+              f'Loops forever: {"yes" if grid.analysis.loop else "no"}\n'
+              f'Dead cells: {len(dead_cells(grid))}\n')
+        print(f'Arguments:\n'
+              f'-i, --iterations: {arguments.iterations}\n'
+              f'-e, --engine: {arguments.engine}\n'
+              f'-l, --detect-loops: {arguments.detect_loops}\n'
+              f'-f, --file: {arguments.file}\n'
+              f'--no-cache: {arguments.no_cache}\n'
+              f'--input: {getattr(arguments.input, "name", None)}\n'
+              f'--profile: {arguments.profile}\n'
+              f'--trace: {arguments.trace}\n'
+              f'--seed: {arguments.seed}'
+              f'\n')
+        gridChecked = input('Type "no" (without quotes) to cancel execution.\n'
+                            'Type anything else to continue.\n')
+        runCode = gridChecked.upper() != 'NO'
+    else:
+        runCode = True
+    if runCode:
+        profiler = None
+        if arguments.profile:
+            from messenger.profiling import Profiler
+            profiler = Profiler()
+        recorder = None
+        if arguments.trace:
+            from messenger.trace import TraceRecorder
+            recorder = TraceRecorder(arguments.trace, seed=arguments.seed)
+        try:
+            grid.run(arguments.iterations, arguments.engine,
+                     arguments.detect_loops, profile=profiler,
+                     trace=recorder)
+        except IterationLimitError:
+            # Running out of iterations is how -i stops code that would
+            # run forever, so the profile is still worth saving
+            if profiler is not None:
+                _save_profile(profiler, arguments.profile)
+            raise
+        if profiler is not None:
+            _save_profile(profiler, arguments.profile)
+
+def _save_profile(profiler, path):
+    """Write what profiler recorded to the file at path as JSON."""
+    with open(path, 'w') as profileFile:
+        profileFile.write(profiler.to_json())
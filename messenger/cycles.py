@@ -0,0 +1,226 @@
+"""Cycle detection for Messenger.
+
+Code where no message can reach R, T, or I is deterministic, so once
+every message in the grid is back in a state it has been in before, the
+ticks in between repeat forever. The state is compared with Brent's
+algorithm, which only needs to remember one earlier state at a time.
+States hold the content of each message as it is, since MessengerLists
+are immutable and remember their hashes, so a LIST that hasn't changed
+costs nothing to compare again.
+Code that messenger.analysis has already found to be a single message
+that ends up going around redirectors forever isn't run at all.
+"""
+
+import copy
+import time
+
+from messenger.analysis import at_start, trace_loop
+from messenger.interpreter import (InfiniteLoopError, IterationLimitError,
+                                   OP_INPUT, OP_RANDOM, OP_TIME)
+from messenger.output import NullSink, OutputSink
+
+def state_key(grid):
+    """Return a hashable snapshot of every message in grid.
+    Messages trapped in functions are keyed by their cell and content
+    only, since their direction is never used again.
+    """
+    moving = tuple([(m.x, m.y, m.dir, m._content)
+                    for m in grid.movingMessages])
+    trapped = tuple(sorted([(index, m._content)
+                            for index, m in grid.occupancy.items()]))
+    return moving, trapped
+
+def is_deterministic(grid):
+    """Return True if no message in grid can reach an R, T, or I. Once
+    the messages have moved, the Analysis no longer applies, so any R,
+    T, or I in the code counts.
+    """
+    if at_start(grid):
+        return not grid.analysis.opcodes & {OP_RANDOM, OP_TIME, OP_INPUT}
+    return not any(grid.has_opcode(opcode)
+                   for opcode in (OP_RANDOM, OP_TIME, OP_INPUT))
+
+def skip_loop(grid, maxIterations):
+    """Raise the error run_detecting_cycles would for grid, whose
+    Analysis says it is a single message that ends up going around
+    redirectors forever, without running it. The message is moved to
+    where it would be when the error is raised.
+    """
+    path, start = trace_loop(grid)
+    length = len(path) - start
+    state = lambda tick: (path[tick] if tick < len(path)
+                          else path[start + (tick - start) % length])
+    # Run Brent's algorithm on the states like run_detecting_cycles does
+    tortoise = state(0)
+    tortoiseTick = 0
+    power = 1
+    tick = 0
+    while True:
+        tick += 1
+        if maxIterations and tick >= maxIterations:
+            break
+        if state(tick) == tortoise:
+            break
+        if tick - tortoiseTick == power: # Move the tortoise
+            tortoise = state(tick)
+            tortoiseTick = tick
+            power *= 2
+    positionState, content = state(tick)
+    index, direction = divmod(positionState, 4)
+    m = grid.movingMessages[0]
+    m.content = content
+    m.x = index % grid.stride - 1
+    m.y = index // grid.stride - 1
+    m.dir = direction
+    grid.tickNumber = tick
+    if maxIterations and tick >= maxIterations:
+        raise IterationLimitError(tick)
+    raise InfiniteLoopError(f'Code loops forever without printing '
+                            f'anything (ticks {start + 1} to '
+                            f'{start + length} repeat)',
+                            start, length)
+
+def _replay(grid):
+    """Return a copy of grid with copies of its messages, which doesn't
+    print anything.
+    """
+    replay = copy.copy(grid)
+    replay.movingMessages = [m.clone() for m in grid.movingMessages]
+    replay.occupancy = {index: m.clone()
+                        for index, m in grid.occupancy.items()}
+    for m in replay.messages:
+        m.grid = replay
+    replay.output = NullSink()
+    return replay
+
+class _EdgeSink(OutputSink):
+    """Output kept as (edge, content, text) for each message that left
+    the grid, with an edge of 'text' for output written without one.
+    """
+
+    def __init__(self):
+        """Return an _EdgeSink with no output."""
+        super().__init__(bufferSize=0)
+        self.edges = []
+
+    def write_edge(self, edge, content, text):
+        """Keep the output of a message that left the grid."""
+        self.edges.append((edge, content, text))
+
+    def emit(self, text):
+        """Keep output written without an edge."""
+        self.edges.append(('text', None, text))
+
+def _write_ticks(output, ticks):
+    """Write what each of ticks printed, as lists of (edge, content,
+    text), to output, through write_edge where there is an edge.
+    """
+    for edges in ticks:
+        for edge, content, text in edges:
+            if edge == 'text':
+                output.write(text)
+            else:
+                output.write_edge(edge, content, text)
+
+def find_cycle(grid, length):
+    """Replay grid, a copy of the grid as it was when cycle detection
+    started, to find where its cycle of length ticks begins.
+    Return the number of ticks before the cycle, what each tick of the
+    cycle prints as a list of (edge, content, text), and a replay of the
+    grid at the start of the cycle.
+    """
+    tortoise = _replay(grid)
+    hare = _replay(grid)
+    for _ in range(length):
+        hare.tick()
+    start = 0
+    while state_key(tortoise) != state_key(hare):
+        tortoise.tick()
+        hare.tick()
+        start += 1
+    outputs = []
+    hare.output = _EdgeSink()
+    for _ in range(length):
+        hare.tick()
+        outputs.append(hare.output.edges)
+        hare.output.edges = []
+    hare.output = NullSink()
+    return start, outputs, hare
+
+def run_detecting_cycles(grid, maxIterations, deadline=None):
+    """Run grid like MessengerGrid.run, but raise an InfiniteLoopError
+    as soon as it repeats itself without printing anything.
+    If it repeats itself and prints, the output up to maxIterations is
+    written without running the ticks in between.
+    Grids with R, T, or I in them are run normally.
+    Like MessengerGrid.run, ticks are counted from 0 again, starting from
+    wherever the messages are now.
+    deadline is a time.perf_counter() value to stop at, or None.
+    """
+    grid.tickNumber = 0
+    if not is_deterministic(grid):
+        return grid._run_ticks(maxIterations, deadline)
+    if grid.analysis.loop is not None and at_start(grid):
+        return skip_loop(grid, maxIterations)
+    entry = _replay(grid) # Where the cycle is looked for from
+    tortoise = state_key(grid)
+    tortoiseHash = hash(tortoise)
+    tortoiseTick = 0
+    power = 1
+    while grid.movingMessages:
+        grid.tick()
+        grid.tickNumber += 1
+        if maxIterations and grid.tickNumber >= maxIterations:
+            raise IterationLimitError(grid.tickNumber)
+        if deadline and time.perf_counter() >= deadline:
+            raise TimeoutError(f'Timed out after {grid.tickNumber} '
+                               f'iterations')
+        key = state_key(grid)
+        keyHash = hash(key)
+        if keyHash == tortoiseHash and key == tortoise:
+            break
+        if grid.tickNumber - tortoiseTick == power: # Move the tortoise
+            tortoise, tortoiseHash = key, keyHash
+            tortoiseTick = grid.tickNumber
+            power *= 2
+    else: # Terminated normally
+        return
+
+    length = grid.tickNumber - tortoiseTick
+    start, outputs, replay = find_cycle(entry, length)
+    if not any(outputs):
+        raise InfiniteLoopError(f'Code loops forever without printing '
+                                f'anything (ticks {start + 1} to '
+                                f'{start + length} repeat)',
+                                start, length)
+    if not maxIterations: # It prints forever, so keep printing
+        return grid._run_ticks(0, deadline)
+
+    # Write what the rest of the ticks up to maxIterations would print
+    phase = (grid.tickNumber - start) % length
+    outputs = outputs[phase:] + outputs[:phase]
+    cycles, leftover = divmod(maxIterations - grid.tickNumber, length)
+    if type(grid.output).write_edge is OutputSink.write_edge:
+        # The sink only wants the text, so write it in big batches
+        cycleOutput = ''.join(text for edges in outputs
+                              for _, _, text in edges)
+        repeats = max(1, 65536 // max(1, len(cycleOutput)))
+        while cycles > 0:
+            grid.output.write(cycleOutput * min(cycles, repeats))
+            cycles -= repeats
+        grid.output.write(''.join(text for edges in outputs[:leftover]
+                                  for _, _, text in edges))
+    else: # The sink cares which edge each message left by
+        for _ in range(cycles):
+            _write_ticks(grid.output, outputs)
+        _write_ticks(grid.output, outputs[:leftover])
+
+    # Leave the grid as it would be after maxIterations ticks
+    for _ in range((maxIterations - start) % length):
+        replay.tick()
+    for m in replay.messages:
+        m.grid = grid
+    grid.movingMessages = replay.movingMessages
+    grid.occupancy = replay.occupancy
+    grid.tickNumber = maxIterations
+    raise IterationLimitError(grid.tickNumber)
@@ -0,0 +1,201 @@
+"""Places the I cell of Messenger can get its input from.
+
+An input provider has a read(kind) method that returns the next INT or
+LIST. PromptInput asks the user like the interpreter always has, while
+QueueInput and StreamInput let code with I in it run without anyone
+typing anything.
+"""
+
+import collections
+import sys
+
+from messenger.lists import MessengerList
+
+### PARSING ###
+
+# A LIST of INTs with no NULLs or LISTs in it, which is parsed in 1 go.
+# re is only imported once a LIST is parsed, since it is slow to import.
+_FLAT_LIST = r'\[\s*(-?\d+(?:\s*,\s*-?\d+)*)?\s*\]'
+_TOKEN = r'(?i)\s*(?:(-?\d+)|(NULL)|(\[)|(\])|(,))'
+_NUMBER, _NULL, _OPEN, _CLOSE, _COMMA = range(1, 6)
+# What the parser just read
+_AFTER_OPEN, _AFTER_VALUE, _AFTER_COMMA = range(3)
+
+def parse_int(text):
+    """Return the INT written in text. Raise a ValueError if text isn't
+    a valid INT.
+    """
+    try:
+        return int(text)
+    except ValueError:
+        raise ValueError(f'Invalid INT ({repr(text)})') from None
+
+def parse_list(text):
+    """Return the LIST written in text, such as '[1, NULL, [-2, []]]',
+    as a MessengerList. NULL can be in any case. Raise a ValueError if
+    text isn't a valid LIST.
+    """
+    import re
+
+    text = text.strip()
+    flat = re.fullmatch(_FLAT_LIST, text)
+    if flat:
+        elements = flat.group(1)
+        return MessengerList(map(int, elements.split(',')) if elements
+                             else ())
+
+    stack = [] # Elements of each LIST that hasn't been closed yet
+    result = None
+    state = _AFTER_COMMA # A value has to come next
+    position = 0
+    tokenPattern = re.compile(_TOKEN)
+    while position < len(text) and result is None:
+        token = tokenPattern.match(text, position)
+        if token is None:
+            break
+        position = token.end()
+        kind = token.lastindex
+        if kind == _COMMA:
+            if state != _AFTER_VALUE:
+                break
+            state = _AFTER_COMMA
+        elif kind == _CLOSE:
+            if state == _AFTER_COMMA:
+                break
+            value = MessengerList(stack.pop())
+            if stack:
+                stack[-1].append(value)
+                state = _AFTER_VALUE
+            else:
+                result = value
+        else:
+            if state == _AFTER_VALUE or (not stack and kind != _OPEN):
+                break
+            if kind == _OPEN:
+                stack.append([])
+                state = _AFTER_OPEN
+            else:
+                stack[-1].append(int(token.group(_NUMBER)) if kind == _NUMBER
+                                 else None)
+                state = _AFTER_VALUE
+    if result is None or position != len(text):
+        raise ValueError(f'Invalid LIST ({repr(text)})')
+    return result
+
+def parse_input(text, kind):
+    """Return the INT or LIST written in text, where kind is 'INT' or
+    'LIST'.
+    """
+    return parse_int(text) if kind == 'INT' else parse_list(text)
+
+def to_messenger_list(elements):
+    """Return a MessengerList of elements, which can contain ints, None,
+    and more lists. Raise a ValueError if anything else is in it.
+    """
+    if isinstance(elements, MessengerList):
+        return elements
+    converted = []
+    for element in elements:
+        if isinstance(element, (list, tuple, MessengerList)):
+            converted.append(to_messenger_list(element))
+        elif element is None or (isinstance(element, int)
+                                 and not isinstance(element, bool)):
+            converted.append(element)
+        else:
+            raise ValueError(f'Invalid LIST ({repr(elements)})')
+    return MessengerList(converted)
+
+def convert_input(value, kind):
+    """Return value as the input kind ('INT' or 'LIST') asks for. value
+    can be an int, a list, or a string to be parsed.
+    """
+    if isinstance(value, str):
+        return parse_input(value, kind)
+    if kind == 'INT':
+        if isinstance(value, int) and not isinstance(value, bool):
+            return value
+        raise ValueError(f'Invalid INT ({repr(value)})')
+    if isinstance(value, (list, tuple, MessengerList)):
+        return to_messenger_list(value)
+    raise ValueError(f'Invalid LIST ({repr(value)})')
+
+### INPUTPROVIDER CLASSES ###
+
+class InputProvider:
+    """Somewhere the I cell gets its input from."""
+
+    def read(self, kind):
+        """Return the next input: an int if kind is 'INT', or a
+        MessengerList if kind is 'LIST'.
+        """
+        raise NotImplementedError
+
+class PromptInput(InputProvider):
+    """Input typed in by the user after a prompt."""
+
+    def read(self, kind):
+        """Ask the user for the next input and return it."""
+        if kind == 'INT':
+            return parse_int(input('Input an INT: '))
+        return parse_list(input('Input a LIST: '))
+
+class StreamInput(InputProvider):
+    """Input read from a text stream, 1 value per line."""
+
+    def __init__(self, stream=None):
+        """Return a StreamInput that reads from stream. If stream is
+        None, whatever sys.stdin is when the input is read is used.
+        """
+        self.stream = stream
+
+    def read(self, kind):
+        """Read the next line of the stream and return its value."""
+        line = (self.stream or sys.stdin).readline()
+        if not line:
+            raise EOFError('Ran out of input')
+        return parse_input(line.rstrip('\r\n'), kind)
+
+class QueueInput(InputProvider):
+    """Input taken in order from a list of values given in advance.
+    Each value can be an int, a list, or a string to be parsed.
+    """
+
+    def __init__(self, values=()):
+        """Return a QueueInput holding values."""
+        self.values = collections.deque(values)
+
+    def __repr__(self):
+        """Return a string representation of the QueueInput."""
+        return f'<QueueInput with {len(self.values)} values left>'
+
+    def __len__(self):
+        """Return the number of values that haven't been read yet."""
+        return len(self.values)
+
+    def add(self, *values):
+        """Add values to the end of the queue."""
+        self.values.extend(values)
+
+    def read(self, kind):
+        """Remove the next value from the queue and return it."""
+        if not self.values:
+            raise EOFError('Ran out of input')
+        return convert_input(self.values.popleft(), kind)
+
+### OTHER FUNCTIONS ###
+
+def make_input(source=None):
+    """Return an InputProvider for source, which can be: None to prompt
+    the user, an InputProvider, a text stream, a string with 1 value per
+    line, or an iterable of values.
+    """
+    if source is None:
+        return PromptInput()
+    elif isinstance(source, InputProvider):
+        return source
+    elif hasattr(source, 'readline'):
+        return StreamInput(source)
+    elif isinstance(source, str):
+        return QueueInput(source.splitlines())
+    else:
+        return QueueInput(source)
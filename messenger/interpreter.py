@@ -1,12 +1,90 @@
-import argparse
+import mmap
 import random
 import time
 
+from messenger.inputs import make_input, parse_list
+from messenger.lists import MessengerList
+from messenger.output import CaptureSink, make_sink
+
+### ERRORS ###
+
+class InfiniteLoopError(RuntimeError):
+    """Raised when Messenger code is certain never to terminate
+    or print anything else.
+    """
+
+    def __init__(self, message, startTick, length):
+        """Return an InfiniteLoopError for a loop of length ticks
+        that starts after tick startTick.
+        """
+        super().__init__(message)
+        self.startTick = startTick
+        self.length = length
+
+class IterationLimitError(RuntimeError):
+    """Raised when Messenger code runs for the maximum number of
+    iterations without terminating.
+    """
+
+    def __init__(self, iterations):
+        """Return an IterationLimitError for code that ran for
+        iterations ticks.
+        """
+        super().__init__(f'Ran for {iterations} iterations '
+                         f'without terminating')
+        self.iterations = iterations
+
+### OPCODES ###
+
+# Every character in the code is compiled into a small-integer opcode,
+# which is its index in OPCODE_CHARS. The last three opcodes are only used
+# for the padding around the grid, so that a message stepping off the edge
+# still lands on a cell.
+OPCODE_CHARS = ' ^>v<RWNLT0123456789ISBE+-*/=G'
+(OP_SPACE, OP_UP, OP_RIGHT, OP_DOWN, OP_LEFT, OP_RANDOM, OP_WHILE, OP_NULL,
+ OP_LIST, OP_TIME) = range(10)
+OP_DIGIT = 10 # '0' through '9' are OP_DIGIT through OP_DIGIT + 9
+(OP_INPUT, OP_SPLIT, OP_BEGIN, OP_END, OP_ADD, OP_SUBTRACT, OP_MULTIPLY,
+ OP_DIVIDE, OP_EQUALS, OP_GREATER) = range(20, 30)
+OP_VANISH = 30 # Top or left edge
+OP_PRINT_RIGHT = 31 # Right edge
+OP_PRINT_BOTTOM = 32 # Bottom edge
+OPCODE_TABLE = str.maketrans({char: chr(opcode)
+                              for opcode, char in enumerate(OPCODE_CHARS)})
+# The same for code as bytes, and back again
+OPCODE_BYTES_TABLE = bytes.maketrans(OPCODE_CHARS.encode(),
+                                     bytes(range(len(OPCODE_CHARS))))
+CHAR_BYTES_TABLE = bytes.maketrans(bytes(range(len(OPCODE_CHARS))),
+                                   OPCODE_CHARS.encode())
+
+# Grids with more cells than this that are mostly ' ' are stored sparsely.
+# A stored cell takes about 70 bytes in a dictionary instead of 1 byte, so
+# only grids that are almost all ' ' save any memory.
+SPARSE_CELLS = 1 << 22
+SPARSE_DENSITY = 100 # At most 1 in this many cells isn't ' '
+# re is only imported when code is compiled, so code loaded from
+# messenger.cache doesn't have to wait for it
+_UNKNOWN_CHAR = rb'[^<>^v SN0-9LI+\-*/W=GBERT\r\n]'
+_LINE_BREAK = rb'\r\n|\r|\n'
+_NOT_SPACE = rb'[^ \r\n]'
+
+### DIRECTIONS ###
+
+# Directions are stored as 0-3, clockwise from up, so turning is addition
+UP, RIGHT, DOWN, LEFT = range(4)
+DIRECTION_NAMES = ('up', 'right', 'down', 'left')
+DX = (0, 1, 0, -1)
+DY = (-1, 0, 1, 0)
+ARROW_DIRECTIONS = {'^': UP, '>': RIGHT, 'v': DOWN, '<': LEFT}
+
 ### MESSENGERMESSAGE CLASS ###
 
 class MessengerMessage:
     """A message in Messenger."""
 
+    __slots__ = ('x', 'y', 'dir', '_content', 'type', 'grid', 'inFunc',
+                 'movedThisTick', 'needsInput')
+
     def __init__(self, x, y, direction, content, grid, inFunc=True):
         """Return a MessengerMessage with the corresponding position,
         direction, and content, as well as the grid the message is in.
@@ -25,29 +103,44 @@ class MessengerMessage:
         if self.inFunc:
             direction = 'inside a function'
         else:
-            direction = f'going {self.dir}'
+            direction = f'going {DIRECTION_NAMES[self.dir]}'
         return (f'<Message containing {self.content} at ({self.x}, {self.y}) '
                 f'{direction}>')
 
     @property
-    def type(self):
-        """Return one of 'NULL', 'INT', or 'LIST', depending on the
-        content attribute.
+    def content(self):
+        """Return the content the MessengerMessage is carrying."""
+        return self._content
+
+    @content.setter
+    def content(self, content):
+        """Set the content and the type attribute, which is one of
+        'NULL', 'INT', or 'LIST'.
         """
-        if self.content is None:
-            return 'NULL'
-        elif isinstance(self.content, int):
-            return 'INT'
-        elif isinstance(self.content, list):
-            return 'LIST'
+        if content is None:
+            self.type = 'NULL'
+        elif isinstance(content, int):
+            self.type = 'INT'
+        elif isinstance(content, MessengerList):
+            self.type = 'LIST'
+        elif isinstance(content, list):
+            content = MessengerList(content)
+            self.type = 'LIST'
         else:
             raise TypeError(f'Message content is of an invalid type '
-                            f'({repr(self.content)})')
+                            f'({repr(content)})')
+        self._content = content
         
     def clone(self):
         """Return a deep copy of the MessengerMessage."""
-        messageClone = MessengerMessage(self.x, self.y, self.dir, self.content,
-                                        self.grid, self.inFunc)
+        messageClone = MessengerMessage.__new__(MessengerMessage)
+        messageClone.x = self.x
+        messageClone.y = self.y
+        messageClone.dir = self.dir
+        messageClone._content = self._content
+        messageClone.type = self.type
+        messageClone.grid = self.grid
+        messageClone.inFunc = self.inFunc
         messageClone.movedThisTick = self.movedThisTick
         messageClone.needsInput = self.needsInput
         return messageClone
@@ -59,320 +152,636 @@ class MessengerMessage:
         self.movedThisTick = not self.inFunc
         if not self.inFunc: # It can't move if it's stuck in a function
             # Move the message 1 unit
-            if self.dir == 'up':
-                self.y -= 1
-            elif self.dir == 'down':
-                self.y += 1
-            elif self.dir == 'left':
-                self.x -= 1
-            elif self.dir == 'right':
-                self.x += 1
-            # Check if the message landed on a function
-            characterAtPosition = self.grid[self.x, self.y]
-            if characterAtPosition == ' ':
-                self.inFunc = False
-            elif characterAtPosition == '^':
-                self.dir = 'up'
-                self.inFunc = False
-            elif characterAtPosition == '>':
-                self.dir = 'right'
-                self.inFunc = False
-            elif characterAtPosition == 'v':
-                self.dir = 'down'
-                self.inFunc = False
-            elif characterAtPosition == '<':
-                self.dir = 'left'
-                self.inFunc = False
-            elif characterAtPosition == 'R':
-                self.turn(random.choice([-1, 1]))
-                self.inFunc = False
-            elif characterAtPosition == 'W':
-                if (self.type == 'LIST'
-                    or (self.type == 'INT' and self.content > 0)):
-                    self.turn(-1)
-                elif (self.type == 'NULL'
-                      or (self.type == 'INT' and self.content <= 0)):
-                    self.turn(1)
-                self.inFunc = False
-            elif characterAtPosition == 'N':
-                self.content = None
-                self.inFunc = False
-            elif characterAtPosition in '0123456789':
-                self.content = int(characterAtPosition)
-                self.inFunc = False
-            elif characterAtPosition == 'L':
-                self.content = [self.content]
-                self.inFunc = False
-            elif characterAtPosition == 'T':
-                self.content = int(time.time() * 1000)
-                self.inFunc = False
-            elif characterAtPosition == 'I':
-                self.needsInput = True
-                self.inFunc = False
-            else:
-                self.inFunc = True
+            self.x += DX[self.dir]
+            self.y += DY[self.dir]
+            # Run whatever is on the cell the message landed on
+            grid = self.grid
+            grid.handlers[grid.opcodes[(self.y + 1) * grid.stride
+                                       + self.x + 1]](self)
 
     def turn(self, rotations):
         """Change the direction of the MessengerMessage.
         Positive numbers indicate clockwise rotations, while
         negative numbers indicate counterclockwise rotations.
         """
-        directionNumber = ['up', 'right', 'down', 'left'].index(self.dir)
-        directionNumber = (directionNumber + rotations) % 4
-        self.dir = ['up', 'right', 'down', 'left'][directionNumber]
+        self.dir = (self.dir + rotations) % 4
         
     def release(self):
         """Set the inFunc attribute to False and return None."""
         self.inFunc = False
 
+### CELL HANDLERS ###
+
+# Each handler runs the cell a moving message just landed on.
+# MessengerMessage.tick looks them up by opcode in CELL_HANDLERS.
+
+def _cell_empty(message):
+    """Handle ' ' and the padding around the grid."""
+    message.inFunc = False
+
+def _cell_redirect(direction):
+    """Return a handler for the redirector pointing in direction."""
+    def handler(message):
+        message.dir = direction
+        message.inFunc = False
+    return handler
+
+def _cell_random(message):
+    """Handle R: turn left or right at random."""
+    message.turn(message.grid.random.choice([-1, 1]))
+    message.inFunc = False
+
+def _cell_while(message):
+    """Handle W: turn left if the content is truthy, right otherwise."""
+    contentType = message.type
+    if (contentType == 'LIST'
+        or (contentType == 'INT' and message._content > 0)):
+        message.dir = (message.dir - 1) % 4
+    else: # NULL, or an INT <= 0
+        message.dir = (message.dir + 1) % 4
+    message.inFunc = False
+
+# The content setter is skipped below when the type is already known
+
+def _cell_null(message):
+    """Handle N: set the content to NULL."""
+    message._content = None
+    message.type = 'NULL'
+    message.inFunc = False
+
+def _cell_digit(digit):
+    """Return a handler for a digit cell."""
+    def handler(message):
+        message._content = digit
+        message.type = 'INT'
+        message.inFunc = False
+    return handler
+
+def _cell_list(message):
+    """Handle L: wrap the content in a LIST."""
+    message._content = MessengerList((message._content,))
+    message.type = 'LIST'
+    message.inFunc = False
+
+def _cell_time(message):
+    """Handle T: set the content to the time in milliseconds."""
+    message._content = message.grid.clock()
+    message.type = 'INT'
+    message.inFunc = False
+
+def _cell_input(message):
+    """Handle I: flag the message so the grid asks for input."""
+    message.needsInput = True
+    message.inFunc = False
+
+def _cell_function(message):
+    """Handle S, B, E, and +-*/=G: trap the message in the function."""
+    message.inFunc = True
+
+CELL_HANDLERS = ((_cell_empty,
+                  _cell_redirect(UP),
+                  _cell_redirect(RIGHT),
+                  _cell_redirect(DOWN),
+                  _cell_redirect(LEFT),
+                  _cell_random,
+                  _cell_while,
+                  _cell_null,
+                  _cell_list,
+                  _cell_time)
+                 + tuple(_cell_digit(digit) for digit in range(10))
+                 + (_cell_input,)
+                 + (_cell_function,) * 9 # S, B, E, and +-*/=G
+                 + (_cell_empty,) * 3) # Padding
+
+### SPARSEOPCODES CLASS ###
+
+class SparseOpcodes(dict):
+    """The opcodes of a huge, mostly empty grid, stored as a dictionary
+    of the cells that aren't ' '. Any other index gives OP_SPACE or the
+    padding around the grid, just like the bytes MessengerGrid.opcodes
+    is for other grids.
+    """
+
+    __slots__ = ('stride', 'height')
+
+    def __init__(self, stride, height):
+        """Return empty SparseOpcodes for a grid of the given stride
+        and height.
+        """
+        super().__init__()
+        self.stride = stride
+        self.height = height
+
+    def __missing__(self, index):
+        """Return the opcode of a cell that isn't stored."""
+        y, x = divmod(index, self.stride)
+        if y == 0:
+            return OP_VANISH
+        elif y > self.height:
+            return OP_PRINT_BOTTOM
+        elif x == 0:
+            return OP_VANISH
+        elif x == self.stride - 1:
+            return OP_PRINT_RIGHT
+        else:
+            return OP_SPACE
+
 ##### MESSENGERGRID CLASS ###
         
 class MessengerGrid:
-    """A 2D grid containing Messenger code."""
-
-    def __init__(self, gridString):
-        """Return a MessengerGrid formed from the code gridString."""
-        # Raise an error if unknown characters are in code
-        if (unknownCharSet := set(gridString)
-            - set('<>^v SN0123456789LI+-*/W=GBERT\r\n')) != set():
-            unknownCharList = sorted(list(unknownCharSet))
-            characterPlural = 's' if len(unknownCharList) >= 2 else ''
-            unknownCharStr = ', '.join([repr(i) for i in unknownCharList])
-            raise SyntaxError(f'Unknown character{characterPlural} '
-                              f'({unknownCharStr}) found in code')
-
-        # Align the code into a grid format
-        allLines = gridString.splitlines()
-        if allLines == []: # Need at least 1 line
-            allLines = ['']
-        maxLineLength = max(map(len, allLines), default=1)
-        self.code = [[char for char in line.ljust(maxLineLength)]
-                     for line in allLines]
+    """A 2D grid containing Messenger code.
+    The code is compiled once into MessengerGrid.opcodes and never
+    changes, so the grid only stores it once.
+    """
+
+    def __init__(self, gridString, output=None, inputs=None, sparse=None):
+        """Return a MessengerGrid formed from the code gridString.
+        output is where messages that leave the grid are written: None for
+        sys.stdout, or anything messenger.output.make_sink accepts.
+        inputs is where I gets its input from: None to prompt the user, or
+        anything messenger.inputs.make_input accepts.
+        If sparse is True, only the cells that aren't ' ' are stored.
+        By default, that happens for huge grids that are mostly empty.
+        """
+        _check_characters(gridString)
+        self._compile(gridString.encode('ascii'), sparse)
+        self._start(output, inputs)
+
+    @classmethod
+    def from_file(cls, path, output=None, inputs=None, sparse=None):
+        """Return a MessengerGrid of the code in the file at path.
+        The file is memory-mapped instead of being read into a string,
+        so only the compiled grid has to fit in memory. Files that can't
+        be mapped, like pipes, are read instead.
+        """
+        with open(path, 'rb') as file:
+            try:
+                data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            except (ValueError, OSError): # Empty, or not a regular file
+                data = file.read()
+            try:
+                return cls.from_bytes(data, output, inputs, sparse)
+            finally:
+                if isinstance(data, mmap.mmap):
+                    data.close()
+
+    @classmethod
+    def from_bytes(cls, data, output=None, inputs=None, sparse=None):
+        """Return a MessengerGrid of the code in data, which is bytes or
+        anything else with the buffer protocol, like an mmap.
+        """
+        import re
+
+        if re.search(_UNKNOWN_CHAR, data):
+            _check_characters(bytes(data).decode('utf-8', 'replace'))
+        grid = cls.__new__(cls)
+        grid._compile(data, sparse)
+        grid._start(output, inputs)
+        return grid
+
+    def _compile(self, code, sparse):
+        """Compile code, a bytes-like object, into a flat array of
+        opcodes with a 1-cell border, so moving messages never need a
+        bounds check.
+        """
+        import re
+
+        # Find the lines like str.splitlines would
+        lines = []
+        start = 0
+        for lineBreak in re.finditer(_LINE_BREAK, code):
+            lines.append((start, lineBreak.start()))
+            start = lineBreak.end()
+        if start < len(code) or not lines: # Need at least 1 line
+            lines.append((start, len(code)))
 
         # Get some information about the code grid
-        self.width = maxLineLength
-        self.height = len(allLines)
-        self.originalCode = [[char for char in row] for row in self.code]
+        self.width = max(end - start for start, end in lines)
+        self.height = len(lines)
+        self.stride = self.width + 2
+        cells = self.stride * (self.height + 2)
+        if sparse is None and cells > SPARSE_CELLS:
+            # Count the cells that aren't ' ', up to the most allowed
+            notSpace = 0
+            for notSpace, _ in enumerate(re.finditer(_NOT_SPACE, code), 1):
+                if notSpace > cells // SPARSE_DENSITY:
+                    break
+            sparse = notSpace <= cells // SPARSE_DENSITY
+        self.sparse = bool(sparse)
+
+        if self.sparse:
+            self.opcodes = SparseOpcodes(self.stride, self.height)
+            notSpacePattern = re.compile(_NOT_SPACE)
+            for y, (start, end) in enumerate(lines):
+                rowIndex = (y + 1) * self.stride + 1 - start
+                for cell in notSpacePattern.finditer(code, start, end):
+                    self.opcodes[rowIndex + cell.start()] = (
+                        OPCODE_BYTES_TABLE[code[cell.start()]]
+                    )
+        else:
+            border = bytes((OP_VANISH,))
+            rows = [border * self.stride]
+            for start, end in lines:
+                rows.append(border
+                            + code[start:end].translate(OPCODE_BYTES_TABLE)
+                              .ljust(self.width, bytes((OP_SPACE,)))
+                            + bytes((OP_PRINT_RIGHT,)))
+            rows.append(bytes((OP_PRINT_BOTTOM,)) * self.stride)
+            self.opcodes = b''.join(rows)
+        self.opcodeSet = self._find_opcodes()
+
+    @classmethod
+    def from_compiled(cls, width, height, opcodes, output=None, inputs=None,
+                      opcodeSet=None, analysis=None):
+        """Return a MessengerGrid of code that was already compiled, like
+        the code messenger.cache stores. opcodes is what
+        MessengerGrid.opcodes would be, either bytes or SparseOpcodes,
+        and opcodeSet and analysis are MessengerGrid.opcodeSet and
+        MessengerGrid.analysis if they are known.
+        """
+        grid = cls.__new__(cls)
+        grid.width = width
+        grid.height = height
+        grid.stride = width + 2
+        grid.sparse = isinstance(opcodes, SparseOpcodes)
+        grid.opcodes = opcodes
+        grid.opcodeSet = (grid._find_opcodes() if opcodeSet is None
+                          else frozenset(opcodeSet))
+        grid._start(output, inputs)
+        grid._analysis = analysis
+        return grid
+
+    def _find_opcodes(self):
+        """Return a frozenset of the opcodes in the cells of the code."""
+        if self.sparse:
+            opcodes = set(self.opcodes.values())
+            if len(self.opcodes) < self.width * self.height:
+                opcodes.add(OP_SPACE)
+            return frozenset(opcodes)
+        return frozenset(self.opcodes) - {OP_VANISH, OP_PRINT_RIGHT,
+                                          OP_PRINT_BOTTOM}
+
+    def _start(self, output, inputs):
+        """Set up everything but the code and put the first message in
+        the top-left corner.
+        """
+        self.handlers = CELL_HANDLERS
+        self.segments = None # Filled in by the event engine
+        self.random = random # Used by R; can be a random.Random
+        self.clock = milliseconds # Used by T
+        self._analysis = None # Filled in by MessengerGrid.analysis
+        self.output = make_sink(output)
+        self.inputs = make_input(inputs)
         
         # Check if the top-left corner is a redirector--
         # otherwise the message is stuck and throws an error
-        if self[0, 0] in '<>^v':
-            arrowsToWords = {'^': 'up',
-                             '>': 'right',
-                             'v': 'down',
-                             '<': 'left'}
-            self.messages = [MessengerMessage(0, 0, arrowsToWords[self[0, 0]],
-                                              None, self, False)]
-        else:
+        if self[0, 0] not in '<>^v':
             raise ValueError(f'Top-left corner of code '
-                             f'({repr(self.code[0][0])}) must be a redirector')
+                             f'({repr(self[0, 0])}) must be a redirector')
+        self.reset()
 
     def __repr__(self):
         """Return a string representation of the MessengerGrid."""
-        grid = [[char for char in row] for row in self.code]
+        grid = self.code
         for m in self.messages:
             grid[m.y][m.x] = '.'
         return '\n'.join([' '.join(row) for row in grid])
 
     def __getitem__(self, pos):
-        """Return MessengerGrid.code[y][x], or ' ' if out of bounds."""
+        """Return the character at (x, y), or ' ' if out of bounds."""
         x, y = pos
         if 0 <= x < self.width and 0 <= y < self.height:
-            return self.code[y][x]
+            return OPCODE_CHARS[self.opcodes[(y + 1) * self.stride + x + 1]]
         else:
             return ' '
+
+    @property
+    def code(self):
+        """Return a new list of the rows of the code, each of which is a
+        list of characters padded to the width of the grid.
+        """
+        return [list(row) for row in self.rows()]
+
+    def rows(self):
+        """Return a list of the rows of the code as strings padded to the
+        width of the grid.
+        """
+        stride = self.stride
+        if not self.sparse:
+            return [self.opcodes[(y + 1) * stride + 1:
+                                 (y + 1) * stride + 1 + self.width]
+                    .translate(CHAR_BYTES_TABLE).decode('ascii')
+                    for y in range(self.height)]
+        rows = [bytearray(b' ' * self.width) for _ in range(self.height)]
+        for index, opcode in self.opcodes.items():
+            rows[index // stride - 1][index % stride - 1] = (
+                CHAR_BYTES_TABLE[opcode]
+            )
+        return [row.decode('ascii') for row in rows]
+
+    def has_opcode(self, opcode):
+        """Return True if any cell of the code has opcode."""
+        return opcode in self.opcodeSet
+
+    @property
+    def analysis(self):
+        """Return the messenger.analysis.Analysis of the code, which is
+        worked out the first time it is needed.
+        """
+        if self._analysis is None:
+            from messenger.analysis import analyse
+            self._analysis = analyse(self)
+        return self._analysis
+
+    def can_print(self):
+        """Return False if the code can never print anything, without
+        running it. True means it might.
+        """
+        return self.analysis.canOutput
+
+    @property
+    def messages(self):
+        """Return a list of every message in the grid, with the moving
+        messages first and the messages trapped in functions last.
+        """
+        return self.movingMessages + list(self.occupancy.values())
+
+    @messages.setter
+    def messages(self, messages):
+        """Replace every message in the grid."""
+        self.movingMessages = [m for m in messages if not m.inFunc]
+        self.occupancy = {(m.y + 1) * self.stride + m.x + 1: m
+                          for m in messages if m.inFunc}
     
     def tick(self):
         """Run 1 tick of Messenger code."""
-        # Move all the messages
-        for m in self.messages:
-            m.tick()
+        self.movingMessages = self._settle(*self._advance(self.movingMessages))
+
+    def _advance(self, messages):
+        """Move every message in messages 1 unit and run the cells they
+        land on, in a single pass. Return the arrivals, the arrivals at
+        +-*/=G, and the inputs, prints, collisions, and splits that
+        MessengerGrid._settle still has to run.
+        """
+        opcodes = self.opcodes
+        handlers = self.handlers
+        stride = self.stride
+        offset = stride + 1 # Index of (0, 0) in the padded grid
+        occupancy = self.occupancy
+        arrivals = {}
+        trapArrivals = {}
+        inputs = []
+        printed = []
+        collisions = []
+        splits = []
+        for m in messages:
+            # Move the message 1 unit
+            direction = m.dir
+            x = m.x + DX[direction]
+            y = m.y + DY[direction]
+            m.x = x
+            m.y = y
+            index = y * stride + x + offset
+            opcode = opcodes[index]
+            handlers[opcode](m)
+            if opcode < OP_ADD: # In bounds, not waiting for a 2nd message
+                if arrivals.setdefault(index, m) is not m:
+                    if opcode == OP_SPACE: # Both messages are destroyed
+                        del arrivals[index]
+                    else: # Two messages entered a function together
+                        collisions.append(None)
+                if opcode >= OP_INPUT:
+                    if opcode == OP_INPUT:
+                        inputs.append(m)
+                    else: # S, B, or E
+                        splits.append(m)
+            elif opcode < OP_VANISH: # One of +-*/=G
+                if trapArrivals.setdefault(index, m) is not m:
+                    collisions.append(None)
+                elif index in occupancy: # The function gets 2 messages
+                    collisions.append((occupancy[index], opcode, m))
+            elif opcode != OP_VANISH: # Right or bottom edge
+                printed.append(m)
+        return arrivals, trapArrivals, inputs, printed, collisions, splits
 
+    def _settle(self, arrivals, trapArrivals, inputs, printed, collisions,
+                splits):
+        """Finish the tick started by MessengerGrid._advance and return
+        the messages that are still moving.
+        Errors are raised in the same order as they always have been:
+        inputs, then prints, then collisions, then splitters.
+        """
         # Get input if necessary
-        messagesNeedingInput = [m for m in self.messages if m.needsInput]
-        if len(messagesNeedingInput) == 1: # Only one input
-            previousContent = messagesNeedingInput[0].content
+        if len(inputs) == 1: # Only one input
+            previousContent = inputs[0].content
             if previousContent is None:
                 raise TypeError("Can't input as type NULL")
-            elif isinstance(previousContent, int):
-                rawInput = input('Input an INT: ')
-                try:
-                    messagesNeedingInput[0].content = int(rawInput)
-                    messagesNeedingInput[0].needsInput = False
-                except ValueError:
-                    raise ValueError(f'Invalid INT '
-                                     f'({repr(rawInput)})') from None
-            elif isinstance(previousContent, list):
-                rawInput = input('Input a LIST: ').upper()
-                if validList(rawInput):
-                    messagesNeedingInput[0].content = rawInput
-                    messagesNeedingInput[0].needsInput = False
-                else:
-                    raise ValueError(f'Invalid LIST ({repr(rawInput)})')
-        elif len(messagesNeedingInput) > 1: # Too many inputs
-            raise RuntimeError(f"{len(messagesNeedingInput)} inputs can't "
+            self.output.flush() # Show everything printed before asking
+            kind = 'INT' if isinstance(previousContent, int) else 'LIST'
+            inputs[0].content = self.inputs.read(kind)
+            inputs[0].needsInput = False
+        elif len(inputs) > 1: # Too many inputs
+            raise RuntimeError(f"{len(inputs)} inputs can't "
                                f'happen at the same time')
 
-        # Print and delete messages that escaped from the program
-        messagesToPrint = [m for m in self.messages
-                           if m.x >= self.width or m.y >= self.height]
-        if len(messagesToPrint) > 1:
-            raise RuntimeError(f"{len(messagesToPrint)} messages can't be "
-                               f'printed at the same time')
-        messagesInBounds = []
-        for m in self.messages:
-            if m.x < 0 or m.y < 0: # Top or left edge
-                pass
-            elif m.x >= self.width: # Right edge
-                print(str(m.content).replace('None', 'NULL'), end='')
-            elif m.y >= self.height: # Bottom edge
-                if m.type == 'INT':
-                    print(chr(m.content), end='')
-                elif m.type == 'LIST':
-                    try:
-                        print(''.join(map(chr, m.content)), end='')
-                    except TypeError:
-                        raise TypeError(f"Nested lists ({m.content}) can't be "
-                                        f'converted to strings') from None
-            else: # In bounds
-                messagesInBounds.append(m)
-        self.messages = messagesInBounds
-
-        # Get rid of messages in the same position
-        alreadySeen = {}
-        for m in self.messages:
-            if (m.x, m.y) in alreadySeen:
-                if (functionAtPosition := self[m.x, m.y]) != ' ':
-                    if (alreadySeen[(m.x, m.y)].movedThisTick
-                        == m.movedThisTick):
-                        # Two arguments to a function at the same time
-                        raise RuntimeError("Two messages can't go into a "
-                                           'function at the same time')
-                    else: # One of +-*/=G is invoked
-                        if m.movedThisTick:
-                            firstArgument = alreadySeen[(m.x, m.y)]
-                            secondArgument = m
-                        else:
-                            firstArgument = m
-                            secondArgument = alreadySeen[(m.x, m.y)]
-                        output = eval_bin_func(firstArgument,
-                                               functionAtPosition,
-                                               secondArgument)
-                        secondArgument.content = output
-                        secondArgument.release()
-                        alreadySeen[(m.x, m.y)] = secondArgument
-                else:
-                    alreadySeen.pop((m.x, m.y))
-            else:
-                alreadySeen[(m.x, m.y)] = m
-        self.messages = list(alreadySeen.values())
-        
+        # Print messages that escaped from the program
+        if printed:
+            if len(printed) > 1:
+                raise RuntimeError(f"{len(printed)} messages can't be "
+                                   f'printed at the same time')
+            self._print(printed[0])
+
+        # Run +-*/=G on the functions that got their 2nd message
+        survivors = list(arrivals.values())
+        for collision in collisions:
+            if collision is None:
+                raise RuntimeError("Two messages can't go into a "
+                                   'function at the same time')
+            firstArgument, opcode, secondArgument = collision
+            output = self._evaluate(firstArgument, opcode, secondArgument)
+            secondArgument.content = output
+            secondArgument.release()
+            survivors.append(secondArgument)
+        if trapArrivals:
+            occupancy = self.occupancy
+            for index, m in trapArrivals.items():
+                if m.inFunc: # Wait for a 2nd message
+                    occupancy[index] = m
+                else: # Its 1st message was used up
+                    del occupancy[index]
+
         # Run B, E, and S (splitters)
-        updatedMessages = []
-        for m in [message.clone() for message in self.messages]:
-            if self[m.x, m.y] == 'S': # Split
-                # Left clone
-                updatedMessages.append(m.clone())
-                updatedMessages[-1].turn(-1)
-                updatedMessages[-1].release()
-                # Right clone
-                updatedMessages.append(m.clone())
-                updatedMessages[-1].turn(1)
-                updatedMessages[-1].release()
-            elif self[m.x, m.y] == 'B': # Beginning
-                if m.type == 'LIST':
-                    # Left clone: (...)[0]
-                    updatedMessages.append(m.clone())
-                    updatedMessages[-1].turn(-1)
-                    updatedMessages[-1].release()
-                    if updatedMessages[-1].content == []:
-                        newContent = None
-                    else:
-                        newContent = updatedMessages[-1].content[0]
-                    updatedMessages[-1].content = newContent
-                    # Right clone: (...)[1:]
-                    updatedMessages.append(m.clone())
-                    updatedMessages[-1].turn(1)
-                    updatedMessages[-1].release()
-                    newContent = updatedMessages[-1].content[1:]
-                    updatedMessages[-1].content = newContent
-                else:
-                    raise TypeError(f"Can't calculate {m.type} B")
-            elif self[m.x, m.y] == 'E': # End
-                if m.type == 'LIST':
-                    # Left clone: (...)[-1]
-                    updatedMessages.append(m.clone())
-                    updatedMessages[-1].turn(-1)
-                    updatedMessages[-1].release()
-                    if updatedMessages[-1].content == []:
-                        newContent = None
-                    else:
-                        newContent = updatedMessages[-1].content[-1]
-                    updatedMessages[-1].content = newContent
-                    # Right clone: (...)[:-1]
-                    updatedMessages.append(m.clone())
-                    updatedMessages[-1].turn(1)
-                    updatedMessages[-1].release()
-                    newContent = updatedMessages[-1].content[:-1]
-                    updatedMessages[-1].content = newContent
-                else:
-                    raise TypeError(f"Can't calculate {m.type} E")
-            else:
-                updatedMessages.append(m.clone())
-        self.messages = updatedMessages
+        for m in splits:
+            survivors.append(self._split(m))
+        return survivors
+
+    def _print(self, m):
+        """Write the content of m, which has just left the grid."""
+        if m.x >= self.width: # Right edge
+            self.output.write_edge('right', m.content,
+                                   str(m.content).replace('None', 'NULL'))
+        elif m.type == 'INT': # Bottom edge
+            self.output.write_edge('bottom', m.content, chr(m.content))
+        elif m.type == 'LIST':
+            try:
+                text = ''.join(map(chr, m.content))
+            except TypeError:
+                raise TypeError(f"Nested lists ({m.content}) can't be "
+                                f'converted to strings') from None
+            self.output.write_edge('bottom', m.content, text)
+
+    def _evaluate(self, firstArgument, opcode, secondArgument):
+        """Return the content the +-*/=G with the given opcode outputs
+        when secondArgument arrives while firstArgument is waiting.
+        """
+        return eval_bin_func(firstArgument, OPCODE_CHARS[opcode],
+                             secondArgument)
+
+    def _split(self, m):
+        """Run the B, E, or S that m has landed on and return the right
+        output. The message already on the splitter becomes the left
+        output, so only the right output is a new message.
+        """
+        opcode = self.opcodes[(m.y + 1) * self.stride + m.x + 1]
+        if opcode == OP_SPLIT: # Split
+            rightContent = m.content
+        elif m.type != 'LIST':
+            raise TypeError(f"Can't calculate {m.type} "
+                            f'{OPCODE_CHARS[opcode]}')
+        elif opcode == OP_BEGIN: # Beginning
+            # Left: (...)[0], right: (...)[1:]
+            content = m.content
+            m.content = content[0] if content else None
+            rightContent = content[1:]
+        else: # End
+            # Left: (...)[-1], right: (...)[:-1]
+            content = m.content
+            m.content = content[-1] if content else None
+            rightContent = content[:-1]
+        # Right output
+        rightMessage = m.clone()
+        rightMessage.content = rightContent
+        rightMessage.turn(1)
+        rightMessage.release()
+        # Left output
+        m.turn(-1)
+        m.release()
+        return rightMessage
 
-    def run(self, maxIterations):
+    def run(self, maxIterations, engine='tick', detectCycles=False,
+            capture=False, timeLimit=None, profile=None, trace=None):
         """Runs Messenger code until all messages either disappear or
-        get trapped in functions."""
-        tickNumber = 0
-        if maxIterations == 0: # Don't check for tickNumber
-            while not all([m.inFunc for m in self.messages]):
-                self.tick()
-                tickNumber += 1
-        else:
-            while not all([m.inFunc for m in self.messages]):
-                self.tick()
-                tickNumber += 1
-                if tickNumber >= maxIterations:
-                    raise RuntimeError(f'Ran for {tickNumber} iterations '
-                                       f'without terminating')
+        get trapped in functions.
+        engine is 'tick' to move every message 1 unit per tick,
+        'event' to skip messages ahead to the next cell where something
+        happens (see messenger.segments), or 'numpy' to move them all at
+        once with NumPy (see messenger.vectorized).
+        If detectCycles is True, an InfiniteLoopError is raised as soon
+        as the code repeats itself without printing anything
+        (see messenger.cycles).
+        If capture is True, the output is returned as a string instead of
+        being written to the grid's output. To keep the output of code
+        that raises an error, give the grid a CaptureSink instead.
+        If timeLimit is given, a TimeoutError is raised once the code has
+        run for that many seconds. It is checked between ticks, so a
+        single slow tick can run over.
+        If profile is a messenger.profiling.Profiler, it records where the
+        ticks go. If trace is a messenger.trace.TraceRecorder, it records
+        everything that happens so it can be replayed later. Profiling
+        and tracing only work with the 'tick' engine and without cycle
+        detection, and not both at once.
+        """
+        if capture:
+            output = self.output
+            self.output = CaptureSink()
+            try:
+                self.run(maxIterations, engine, detectCycles,
+                         timeLimit=timeLimit, profile=profile, trace=trace)
+                return self.output.getvalue()
+            finally:
+                self.output = output
+        deadline = time.perf_counter() + timeLimit if timeLimit else None
+        try:
+            if ((profile is not None or trace is not None)
+                and (engine != 'tick' or detectCycles)):
+                raise ValueError("Profiling and tracing only work with the "
+                                 "'tick' engine and without cycle detection")
+            if profile is not None and trace is not None:
+                raise ValueError("Code can't be profiled and traced at the "
+                                 'same time')
+            if detectCycles:
+                if engine != 'tick':
+                    raise ValueError('Cycle detection only works with the '
+                                     "'tick' engine")
+                from messenger.cycles import run_detecting_cycles
+                return run_detecting_cycles(self, maxIterations, deadline)
+            if engine == 'event':
+                from messenger.segments import run_events
+                return run_events(self, maxIterations, deadline)
+            elif engine == 'numpy':
+                from messenger.vectorized import run_vectorized
+                return run_vectorized(self, maxIterations, deadline)
+            elif engine != 'tick':
+                raise ValueError(f'Unknown engine ({repr(engine)})')
+            self.tickNumber = 0
+            if profile is not None:
+                profile.run(self, maxIterations, deadline)
+            elif trace is not None:
+                trace.run(self, maxIterations, deadline)
+            else:
+                self._run_ticks(maxIterations, deadline)
+        finally:
+            self.output.flush()
+
+    def _run_ticks(self, maxIterations, deadline=None):
+        """Run the code 1 tick at a time, counting on from tickNumber.
+        deadline is a time.perf_counter() value to stop at, or None.
+        """
+        while self.movingMessages: # Some message isn't in a function
+            self.tick()
+            self.tickNumber += 1
+            if maxIterations and self.tickNumber >= maxIterations:
+                raise IterationLimitError(self.tickNumber)
+            if deadline and time.perf_counter() >= deadline:
+                raise TimeoutError(f'Timed out after {self.tickNumber} '
+                                   f'iterations')
 
     def reset(self):
-        """Resets the Messenger code to before it was run."""
-        self.code = [[char for char in row] for row in self.originalCode]
-        arrowsToWords = {'^': 'up',
-                         '>': 'right',
-                         'v': 'down',
-                         '<': 'left'}
-        self.messages = [MessengerMessage(0, 0, arrowsToWords[self[0, 0]],
-                                          None, self, False)]
+        """Resets the Messenger code to before it was run. The code
+        itself never changes, so this takes constant time.
+        """
+        self.movingMessages = [MessengerMessage(0, 0,
+                                                ARROW_DIRECTIONS[self[0, 0]],
+                                                None, self, False)]
+        self.occupancy = {}
+        self.tickNumber = 0
 
 ### OTHER FUNCTIONS ###
 
+def milliseconds():
+    """Return the time in milliseconds, which is what T outputs."""
+    return int(time.time() * 1000)
+
+def _check_characters(code):
+    """Raise an error if unknown characters are in code."""
+    if (unknownCharSet := set(code)
+        - set('<>^v SN0123456789LI+-*/W=GBERT\r\n')) != set():
+        unknownCharList = sorted(list(unknownCharSet))
+        characterPlural = 's' if len(unknownCharList) >= 2 else ''
+        unknownCharStr = ', '.join([repr(i) for i in unknownCharList])
+        raise SyntaxError(f'Unknown character{characterPlural} '
+                          f'({unknownCharStr}) found in code')
+
 def validList(inputString):
     """Return True if inputString is a valid list in Messenger,
     and False otherwise.
     """
-    if (not rawInput.startswith('[') or not rawInput.endswith(']')
-        or rawInput.count('[') != rawInput.count(']')):
-        # Doesn't have balanced or surrounding brackets
+    try:
+        parse_list(inputString)
+    except ValueError:
         return False
-    else:
-        listElements = rawInput[1:-1]
-        if listElements == ['']: # Empty list
-            return True
-        for element in listElements: # Check each element
-            if element == '': # Missing element
-                return False
-            if element == 'NULL': # NULL
-                continue
-            elif (element[0] in '-0123456789'
-                  and set(element[1:]) <= set('0123456789')): # INT
-                continue
-            elif validList(element): # LIST
-                continue
-        return True
-    
+    return True
+
 def eval_bin_func(message1, operator, message2):
     """Return the output content from applying operator on message1 and
     message2.
@@ -385,9 +794,9 @@ def eval_bin_func(message1, operator, message2):
         elif message1.type == message2.type == 'LIST':
             return message1.content + message2.content
         elif message1.type == 'INT' and message2.type == 'LIST':
-            return [message1.content] + message2.content
+            return message2.content.prepended(message1.content)
         elif message1.type == 'LIST' and message2.type == 'INT':
-            return message1.content + [message2.content]
+            return message1.content.appended(message2.content)
     elif operator == '-': # Subtract
         if message1.type == 'NULL' or message2.type == 'NULL':
             return None
@@ -0,0 +1,266 @@
+"""The LIST type of Messenger.
+
+A MessengerList is an immutable view of part of a shared Python list, so
+B and E can split off the first or last element without copying the
+rest. Adding an element to either end reuses the shared list whenever
+no other MessengerList has claimed the space next to it yet, which makes
+building a LIST 1 element at a time with + take amortized O(1) per
+element.
+
+Methods that look inside nested LISTs keep their own stack instead of
+recursing, so LISTs can be nested deeper than the recursion limit.
+"""
+
+import itertools
+
+class _Store:
+    """A Python list shared by MessengerLists, with some unused space
+    at the front for elements added to the start of a LIST.
+    """
+
+    __slots__ = ('items', 'low')
+
+    def __init__(self, elements, padding):
+        """Return a _Store holding elements after padding unused
+        slots.
+        """
+        self.items = [None] * padding
+        self.items.extend(elements)
+        self.low = padding # Lowest index used by any MessengerList
+
+class MessengerList:
+    """An immutable LIST in Messenger, which prints and compares the
+    same way a Python list does.
+    """
+
+    __slots__ = ('_store', '_start', '_stop', '_hash')
+
+    def __init__(self, elements=()):
+        """Return a MessengerList containing elements."""
+        self._store = _Store(elements, 0)
+        self._start = 0
+        self._stop = len(self._store.items)
+        self._hash = None
+
+    @classmethod
+    def _view(cls, store, start, stop):
+        """Return a MessengerList of store.items[start:stop]."""
+        view = cls.__new__(cls)
+        view._store = store
+        view._start = start
+        view._stop = stop
+        view._hash = None
+        return view
+
+    @classmethod
+    def _copy_of(cls, elements, length):
+        """Return a MessengerList of elements in a new _Store, with
+        room to grow at the front.
+        """
+        padding = max(8, length)
+        return cls._view(_Store(elements, padding), padding, padding + length)
+
+    def __repr__(self):
+        """Return a string representation of the MessengerList, which is
+        the same as the Python list with the same elements.
+        """
+        parts = ['[']
+        stack = [iter(self)]
+        started = [False] # Whether each LIST has had an element yet
+        while stack:
+            for element in stack[-1]:
+                if started[-1]:
+                    parts.append(', ')
+                started[-1] = True
+                if isinstance(element, MessengerList):
+                    parts.append('[')
+                    stack.append(iter(element))
+                    started.append(False)
+                    break
+                parts.append(repr(element))
+            else:
+                parts.append(']')
+                stack.pop()
+                started.pop()
+        return ''.join(parts)
+
+    def __len__(self):
+        """Return the number of elements in the MessengerList."""
+        return self._stop - self._start
+
+    def __bool__(self):
+        """Return False if the MessengerList is empty."""
+        return self._stop > self._start
+
+    def __iter__(self):
+        """Return an iterator over the elements of the MessengerList."""
+        return itertools.islice(self._store.items, self._start, self._stop)
+
+    def __getitem__(self, index):
+        """Return an element, or a MessengerList of a slice without
+        copying anything.
+        """
+        length = self._stop - self._start
+        if isinstance(index, slice):
+            start, stop, step = index.indices(length)
+            if step != 1:
+                return MessengerList(list(self)[index])
+            stop = max(start, stop)
+            return MessengerList._view(self._store, self._start + start,
+                                       self._start + stop)
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError('MessengerList index out of range')
+        return self._store.items[self._start + index]
+
+    def _elements(self):
+        """Return a Python list of the elements."""
+        return self._store.items[self._start:self._stop]
+
+    def appended(self, element):
+        """Return a MessengerList with element added to the end."""
+        store = self._store
+        if self._stop == len(store.items): # Nothing else uses the space
+            store.items.append(element)
+            return MessengerList._view(store, self._start, self._stop + 1)
+        elements = self._elements()
+        elements.append(element)
+        return MessengerList._copy_of(elements, len(elements))
+
+    def prepended(self, element):
+        """Return a MessengerList with element added to the start."""
+        store = self._store
+        if self._start == store.low and self._start > 0:
+            # Nothing else uses the space
+            store.low -= 1
+            store.items[store.low] = element
+            return MessengerList._view(store, store.low, self._stop)
+        return MessengerList._copy_of(itertools.chain((element,), self),
+                                      len(self) + 1)
+
+    def __add__(self, other):
+        """Return the concatenation of 2 MessengerLists."""
+        if not isinstance(other, MessengerList):
+            return NotImplemented
+        store = self._store
+        if self._stop == len(store.items): # Nothing else uses the space
+            store.items.extend(other._elements())
+            return MessengerList._view(store, self._start,
+                                       self._stop + len(other))
+        elements = self._elements()
+        elements.extend(other)
+        return MessengerList._copy_of(elements, len(elements))
+
+    def __eq__(self, other):
+        """Return True if other has the same elements."""
+        if isinstance(other, MessengerList):
+            if (self._store is other._store and self._start == other._start
+                and self._stop == other._stop):
+                return True
+        elif not isinstance(other, list):
+            return NotImplemented
+        if len(self) != len(other):
+            return False
+        return _difference(self, other) is None
+
+    def __hash__(self):
+        """Return a hash of the elements. The LISTs inside it are hashed
+        first, innermost first, so hashing them again takes no recursion.
+        """
+        if self._hash is None:
+            stack = [self]
+            while stack:
+                top = stack[-1]
+                if top._hash is not None: # Pushed twice
+                    stack.pop()
+                    continue
+                unhashed = [element for element in top
+                            if isinstance(element, MessengerList)
+                            and element._hash is None]
+                if unhashed:
+                    stack.extend(unhashed)
+                else:
+                    top._hash = hash(tuple(top))
+                    stack.pop()
+        return self._hash
+
+    def _compare(self, other):
+        """Return the first pair of things that differ between self and
+        other, which compare the same way as the MessengerLists, or
+        (0, 0) if they are equal. Return None if other isn't a LIST.
+        """
+        if not isinstance(other, (MessengerList, list)):
+            return None
+        return _difference(self, other) or (0, 0)
+
+    def __lt__(self, other):
+        """Return True if self is less than other."""
+        pair = self._compare(other)
+        return NotImplemented if pair is None else pair[0] < pair[1]
+
+    def __le__(self, other):
+        """Return True if self is less than or equal to other."""
+        pair = self._compare(other)
+        return NotImplemented if pair is None else pair[0] <= pair[1]
+
+    def __gt__(self, other):
+        """Return True if self is greater than other."""
+        pair = self._compare(other)
+        return NotImplemented if pair is None else pair[0] > pair[1]
+
+    def __ge__(self, other):
+        """Return True if self is greater than or equal to other."""
+        pair = self._compare(other)
+        return NotImplemented if pair is None else pair[0] >= pair[1]
+
+    def tolist(self):
+        """Return the MessengerList as nested Python lists."""
+        result = []
+        stack = [(iter(self), result)]
+        while stack:
+            elements, target = stack[-1]
+            for element in elements:
+                if isinstance(element, MessengerList):
+                    inner = []
+                    target.append(inner)
+                    stack.append((iter(element), inner))
+                    break
+                target.append(element)
+            else:
+                stack.pop()
+        return result
+
+def _items(elements):
+    """Return the elements of a MessengerList or Python list as a
+    Python list.
+    """
+    return (elements._elements() if isinstance(elements, MessengerList)
+            else elements)
+
+def _difference(first, second):
+    """Return None if the LISTs first and second have the same elements.
+    Otherwise, return the first pair of things that differ, going into
+    LISTs inside them: 2 elements that aren't both LISTs, or the lengths
+    of 2 LISTs where one starts with the other. Comparing the pair gives
+    the same result as comparing first and second as Python lists.
+    """
+    stack = [(_items(first), _items(second), 0)]
+    while stack:
+        firstItems, secondItems, start = stack.pop()
+        for index in range(start, min(len(firstItems), len(secondItems))):
+            a = firstItems[index]
+            b = secondItems[index]
+            if a is b:
+                continue
+            if (isinstance(a, (MessengerList, list))
+                and isinstance(b, (MessengerList, list))):
+                stack.append((firstItems, secondItems, index + 1))
+                stack.append((_items(a), _items(b), 0))
+                break
+            if a != b:
+                return a, b
+        else:
+            if len(firstItems) != len(secondItems):
+                return len(firstItems), len(secondItems)
+    return None
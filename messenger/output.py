@@ -0,0 +1,170 @@
+"""Places the output of Messenger code can go.
+
+Every sink collects the text written to it and passes it on in batches,
+so code that prints a lot doesn't make a system call per character.
+"""
+
+import io
+import sys
+
+### OUTPUTSINK CLASSES ###
+
+class OutputSink:
+    """A buffer for the output of Messenger code. Subclasses decide
+    where the text goes once it is flushed.
+    """
+
+    def __init__(self, bufferSize=65536):
+        """Return an OutputSink that flushes itself once bufferSize
+        characters have been written to it.
+        """
+        self.bufferSize = bufferSize
+        self.buffer = []
+        self.bufferedLength = 0
+
+    def __repr__(self):
+        """Return a string representation of the OutputSink."""
+        return (f'<{type(self).__name__} holding {self.bufferedLength} '
+                f'characters>')
+
+    def write(self, text):
+        """Add text to the output."""
+        self.buffer.append(text)
+        self.bufferedLength += len(text)
+        if self.bufferedLength >= self.bufferSize:
+            self.flush()
+
+    def write_edge(self, edge, content, text):
+        """Add text to the output, where text is content written by a
+        message that left the grid by edge, 'right' or 'bottom'. Sinks
+        that care where their output came from override this.
+        """
+        self.write(text)
+
+    def flush(self):
+        """Pass on all of the output written so far."""
+        if self.buffer:
+            text = ''.join(self.buffer)
+            self.buffer.clear()
+            self.bufferedLength = 0
+            self.emit(text)
+
+    def emit(self, text):
+        """Pass on a batch of output."""
+        raise NotImplementedError
+
+class TextSink(OutputSink):
+    """Output written to a text stream, which is sys.stdout by default."""
+
+    def __init__(self, stream=None, bufferSize=65536):
+        """Return a TextSink that writes to stream. If stream is None,
+        whatever sys.stdout is when the output is flushed is used.
+        """
+        super().__init__(bufferSize)
+        self.stream = stream
+
+    def emit(self, text):
+        """Write a batch of output to the stream."""
+        (self.stream or sys.stdout).write(text)
+
+    def flush(self):
+        """Write all of the output so far to the stream and flush it."""
+        super().flush()
+        (self.stream or sys.stdout).flush()
+
+class BytesSink(OutputSink):
+    """Output encoded and written to a binary stream or a bytearray."""
+
+    def __init__(self, target, encoding='utf-8', errors='strict',
+                 bufferSize=65536):
+        """Return a BytesSink that encodes output with encoding."""
+        super().__init__(bufferSize)
+        self.target = target
+        self.encoding = encoding
+        self.errors = errors
+
+    def emit(self, text):
+        """Encode a batch of output and write it to the target."""
+        data = text.encode(self.encoding, self.errors)
+        if isinstance(self.target, bytearray):
+            self.target += data
+        else:
+            self.target.write(data)
+
+    def flush(self):
+        """Write all of the output so far to the target, and flush it if
+        it is a stream.
+        """
+        super().flush()
+        if hasattr(self.target, 'flush'):
+            self.target.flush()
+
+class CallbackSink(OutputSink):
+    """Output passed to a function."""
+
+    def __init__(self, callback, bufferSize=65536):
+        """Return a CallbackSink that calls callback(text) with each
+        batch of output. A bufferSize of 0 calls it on every write.
+        """
+        super().__init__(bufferSize)
+        self.callback = callback
+
+    def emit(self, text):
+        """Pass a batch of output to the callback."""
+        self.callback(text)
+
+class CaptureSink(OutputSink):
+    """Output kept in memory."""
+
+    def __init__(self, bufferSize=65536):
+        """Return an empty CaptureSink."""
+        super().__init__(bufferSize)
+        self.parts = []
+
+    def emit(self, text):
+        """Keep a batch of output."""
+        self.parts.append(text)
+
+    def getvalue(self):
+        """Return all of the output so far."""
+        self.flush()
+        if len(self.parts) > 1:
+            self.parts[:] = [''.join(self.parts)]
+        return self.parts[0] if self.parts else ''
+
+    def clear(self):
+        """Throw away all of the output so far."""
+        self.buffer.clear()
+        self.bufferedLength = 0
+        self.parts.clear()
+
+class NullSink(OutputSink):
+    """Output that is thrown away."""
+
+    def write(self, text):
+        """Throw away text."""
+
+    def emit(self, text):
+        """Throw away a batch of output."""
+
+### OTHER FUNCTIONS ###
+
+def make_sink(target=None):
+    """Return an OutputSink for target, which can be:
+    None for sys.stdout, an OutputSink, a text stream, a binary stream,
+    a bytearray, or a function that takes the output as a string.
+    """
+    if target is None:
+        return TextSink()
+    elif isinstance(target, OutputSink):
+        return target
+    elif isinstance(target, (bytearray, io.RawIOBase, io.BufferedIOBase)):
+        return BytesSink(target)
+    elif hasattr(target, 'write'):
+        if 'b' in getattr(target, 'mode', ''):
+            return BytesSink(target)
+        return TextSink(target)
+    elif callable(target):
+        return CallbackSink(target)
+    else:
+        raise TypeError(f"Can't send output to {repr(target)}")
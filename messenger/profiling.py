@@ -0,0 +1,187 @@
+"""A profiler for finding where Messenger code spends its ticks.
+
+Pass a Profiler to MessengerGrid.run to record how often each cell is
+visited, how often each kind of cell runs and how long it takes, how
+many messages are alive after each tick, and how long each tick takes.
+While it runs, the grid's cell handlers are swapped for timed ones, so
+grids that aren't profiled run exactly the same code as before.
+"""
+
+import array
+import json
+import math
+import time
+
+from messenger.interpreter import OPCODE_CHARS
+
+# Names of the opcodes, including the 3 kinds of padding around the grid
+OPCODE_NAMES = tuple(OPCODE_CHARS) + ('vanish', 'print right',
+                                      'print bottom')
+# Characters for visit counts, from least to most visited
+HEAT_CHARS = ' .:-=+*#%@'
+
+### PROFILER CLASS ###
+
+class Profiler:
+    """Statistics about 1 or more runs of a MessengerGrid."""
+
+    def __init__(self):
+        """Return an empty Profiler."""
+        self.width = 0
+        self.height = 0
+        self.stride = 0
+        self.code = []
+        self.visits = {} # Index in the padded opcode array: visits
+        self.counts = [0] * len(OPCODE_NAMES)
+        self.seconds = [0.0] * len(OPCODE_NAMES)
+        self.liveMessages = array.array('Q') # After each tick
+        self.tickHistogram = {} # Bit length of tick time in ns: ticks
+        self.ticks = 0
+        self.totalSeconds = 0.0
+
+    def __repr__(self):
+        """Return a string representation of the Profiler."""
+        return f'<Profiler of {self.ticks} ticks>'
+
+    def _prepare(self, grid):
+        """Make room for the cells of grid, keeping what was recorded
+        earlier if it was for a grid of the same size.
+        """
+        if (grid.width, grid.height) != (self.width, self.height):
+            self.width = grid.width
+            self.height = grid.height
+            self.stride = grid.stride
+            self.visits = {}
+        self.code = grid.rows()
+
+    def _wrap_handler(self, opcode, handler, stride):
+        """Return a version of handler that counts and times itself."""
+        visits = self.visits
+        counts = self.counts
+        seconds = self.seconds
+        clock = time.perf_counter
+
+        def profiled(message):
+            index = (message.y + 1) * stride + message.x + 1
+            visits[index] = visits.get(index, 0) + 1
+            start = clock()
+            handler(message)
+            seconds[opcode] += clock() - start
+            counts[opcode] += 1
+
+        return profiled
+
+    def run(self, grid, maxIterations, deadline=None):
+        """Run grid 1 tick at a time like MessengerGrid.run while
+        recording statistics.
+        """
+        self._prepare(grid)
+        stride = grid.stride
+        counts = self.counts
+        seconds = self.seconds
+        liveMessages = self.liveMessages
+        histogram = self.tickHistogram
+        clock = time.perf_counter
+        nanoseconds = time.perf_counter_ns
+        originalHandlers = grid.handlers
+        originalTick = grid.tick
+        originalEvaluate = grid._evaluate
+        originalSplit = grid._split
+
+        # Functions do their work after every message has moved, so
+        # they are timed separately from their handlers
+        def evaluate(firstArgument, opcode, secondArgument):
+            start = clock()
+            try:
+                return originalEvaluate(firstArgument, opcode,
+                                        secondArgument)
+            finally:
+                seconds[opcode] += clock() - start
+
+        def split(message):
+            opcode = grid.opcodes[(message.y + 1) * stride + message.x + 1]
+            start = clock()
+            try:
+                return originalSplit(message)
+            finally:
+                seconds[opcode] += clock() - start
+
+        def tick():
+            start = nanoseconds()
+            try:
+                originalTick()
+            finally:
+                duration = nanoseconds() - start
+                bucket = duration.bit_length()
+                histogram[bucket] = histogram.get(bucket, 0) + 1
+                liveMessages.append(len(grid.movingMessages)
+                                    + len(grid.occupancy))
+                self.ticks += 1
+                self.totalSeconds += duration / 1e9
+
+        grid.handlers = tuple(self._wrap_handler(opcode, handler, stride)
+                              for opcode, handler
+                              in enumerate(originalHandlers))
+        grid.tick = tick
+        grid._evaluate = evaluate
+        grid._split = split
+        try:
+            grid._run_ticks(maxIterations, deadline)
+        finally:
+            grid.handlers = originalHandlers
+            del grid.tick, grid._evaluate, grid._split
+
+    def heatmap(self):
+        """Return the code laid out like MessengerGrid.__repr__, with
+        each character followed by how often its cell was visited, from
+        ' ' for never to '@' for the most. The scale is logarithmic.
+        """
+        cellVisits = [[self.visits.get((y + 1) * self.stride + x + 1, 0)
+                       for x in range(self.width)]
+                      for y in range(self.height)]
+        most = max(map(max, cellVisits), default=0)
+        scale = (len(HEAT_CHARS) - 2) / math.log(most + 1) if most else 0
+        rows = []
+        for line, visitRow in zip(self.code, cellVisits):
+            rows.append(''.join(
+                char + (HEAT_CHARS[1 + int(math.log(visits + 1) * scale)]
+                        if visits else ' ')
+                for char, visits in zip(line, visitRow)
+            ).rstrip())
+        return '\n'.join(rows)
+
+    def as_dict(self):
+        """Return everything the Profiler recorded as a dictionary of
+        things JSON can store.
+        """
+        cellVisits = []
+        for index, visits in sorted(self.visits.items()):
+            y, x = divmod(index, self.stride)
+            if 0 < x <= self.width and 0 < y <= self.height:
+                cellVisits.append([x - 1, y - 1, visits])
+        opcodes = {}
+        for opcode, name in enumerate(OPCODE_NAMES):
+            if self.counts[opcode]:
+                opcodes[name] = {'count': self.counts[opcode],
+                                 'seconds': self.seconds[opcode]}
+        return {
+            'ticks': self.ticks,
+            'seconds': self.totalSeconds,
+            'width': self.width,
+            'height': self.height,
+            'visits': cellVisits, # [x, y, visits] of visited cells
+            'opcodes': opcodes,
+            'liveMessages': self.liveMessages.tolist(),
+            'tickHistogram': [{'minNanoseconds': 1 << bucket >> 1,
+                               'maxNanoseconds': (1 << bucket) - 1,
+                               'ticks': ticks}
+                              for bucket, ticks
+                              in sorted(self.tickHistogram.items())],
+            'heatmap': self.heatmap(),
+        }
+
+    def to_json(self, **kwargs):
+        """Return everything the Profiler recorded as JSON. kwargs are
+        passed on to json.dumps.
+        """
+        return json.dumps(self.as_dict(), **kwargs)
@@ -0,0 +1,279 @@
+"""An event-driven engine for Messenger.
+
+Most ticks only move a message across ' ' or a redirector. Instead of
+moving every message 1 unit per tick, this engine works out how far each
+message can travel before it reaches a cell that does something else,
+and wakes it up on that tick. Messages whose paths cross in between are
+woken up where they meet, so collisions happen exactly when they would
+if the code were run 1 tick at a time.
+
+Every message that sets off is checked against every message already
+travelling, so with lots of messages at once this is slower than moving
+them all every tick. Once more than MAX_FLIGHTS messages are travelling,
+the rest of the code is run 1 tick at a time instead.
+"""
+
+import heapq
+import itertools
+import time
+
+from messenger.interpreter import (DX, DY, OP_SPACE, OP_UP, OP_LEFT,
+                                   IterationLimitError)
+
+# The most messages travelling at once before switching to the tick engine
+MAX_FLIGHTS = 64
+
+### SEGMENT CLASS ###
+
+class Segment:
+    """The path a message takes from a cell until it lands on a cell
+    that isn't ' ' or a redirector.
+    """
+
+    __slots__ = ('runs', 'length', 'minX', 'maxX', 'minY', 'maxY')
+
+    def __init__(self, runs, length):
+        """Return a Segment made of straight runs, each of which is a
+        tuple (startOffset, x, y, direction, runLength), where the
+        message is at (x, y) startOffset ticks after leaving the start.
+        """
+        self.runs = runs
+        self.length = length
+        corners = [(x + DX[direction] * runLength,
+                    y + DY[direction] * runLength)
+                   for _, x, y, direction, runLength in runs]
+        corners += [(x, y) for _, x, y, _, _ in runs]
+        self.minX = min(x for x, _ in corners)
+        self.maxX = max(x for x, _ in corners)
+        self.minY = min(y for _, y in corners)
+        self.maxY = max(y for _, y in corners)
+
+    def __repr__(self):
+        """Return a string representation of the Segment."""
+        return f'<Segment of length {self.length} with {len(self.runs)} runs>'
+
+    def position(self, offset):
+        """Return the (x, y) position of a message offset ticks along the
+        Segment, and the direction it moved in to get there.
+        offset must be from 1 to the length of the Segment.
+        """
+        for start, x, y, direction, runLength in self.runs:
+            if offset <= start + runLength:
+                distance = offset - start
+                return (x + DX[direction] * distance,
+                        y + DY[direction] * distance,
+                        direction)
+        raise ValueError(f'Offset {offset} is past the end of {self!r}')
+
+### SEGMENTTABLE CLASS ###
+
+class SegmentTable:
+    """The Segment starting from every (cell, direction) of a
+    MessengerGrid, worked out the first time it is needed.
+    """
+
+    def __init__(self, grid):
+        """Return an empty SegmentTable for grid."""
+        self.grid = grid
+        self.segments = {}
+
+    def segment(self, x, y, direction):
+        """Return the Segment a message takes when it leaves (x, y)
+        going in direction.
+        """
+        key = ((y + 1) * self.grid.stride + x + 1) * 4 + direction
+        segment = self.segments.get(key)
+        if segment is None:
+            segment = self.segments[key] = self._walk(x, y, direction)
+        return segment
+
+    def _walk(self, x, y, direction):
+        """Follow a message from (x, y) and return its Segment.
+        The Segment also ends early if the message would start going in
+        circles, so every Segment has a finite length.
+        """
+        grid = self.grid
+        opcodes = grid.opcodes
+        stride = grid.stride
+        steps = (-stride, 1, stride, -1)
+        index = (y + 1) * stride + x + 1
+        seen = {index * 4 + direction}
+        runs = []
+        runStart, runX, runY, runDirection = 0, x, y, direction
+        distance = 0
+        while True:
+            index += steps[direction]
+            distance += 1
+            opcode = opcodes[index]
+            if opcode > OP_LEFT: # Something happens here
+                break
+            if opcode != OP_SPACE and opcode - OP_UP != direction: # Turn
+                runs.append((runStart, runX, runY, runDirection,
+                             distance - runStart))
+                direction = opcode - OP_UP
+                runStart = distance
+                runX = index % stride - 1
+                runY = index // stride - 1
+                runDirection = direction
+            state = index * 4 + direction
+            if state in seen: # Going in circles
+                break
+            seen.add(state)
+        if distance > runStart:
+            runs.append((runStart, runX, runY, runDirection,
+                         distance - runStart))
+        return Segment(runs, distance)
+
+### EVENT ENGINE ###
+
+class _Flight:
+    """A message travelling along a Segment."""
+
+    __slots__ = ('message', 'segment', 'start', 'end')
+
+    def __init__(self, message, segment, start):
+        """Return a _Flight that leaves on tick start."""
+        self.message = message
+        self.segment = segment
+        self.start = start
+        self.end = start + segment.length
+
+def first_meeting(segment1, start1, segment2, start2, low, high):
+    """Return the first tick from low to high at which messages that
+    left along segment1 on tick start1 and along segment2 on tick start2
+    are on the same cell, or None if they never are.
+    """
+    if (segment1.maxX < segment2.minX or segment2.maxX < segment1.minX
+        or segment1.maxY < segment2.minY or segment2.maxY < segment1.minY):
+        return None
+    best = None
+    for offset1, x1, y1, direction1, length1 in segment1.runs:
+        begin1 = start1 + offset1
+        if begin1 > high or begin1 + length1 < low:
+            continue
+        for offset2, x2, y2, direction2, length2 in segment2.runs:
+            begin2 = start2 + offset2
+            first = max(begin1, begin2, low)
+            last = min(begin1 + length1, begin2 + length2, high)
+            if first > last:
+                continue
+            # The difference between the positions is c + w * tick
+            wx = DX[direction1] - DX[direction2]
+            wy = DY[direction1] - DY[direction2]
+            cx = x1 - DX[direction1] * begin1 - x2 + DX[direction2] * begin2
+            cy = y1 - DY[direction1] * begin1 - y2 + DY[direction2] * begin2
+            if wx:
+                if cx % wx:
+                    continue
+                tick = -cx // wx
+                if cy + wy * tick:
+                    continue
+            elif wy:
+                if cx or cy % wy:
+                    continue
+                tick = -cy // wy
+            elif cx or cy:
+                continue
+            else: # Side by side the whole time
+                tick = first
+            if first <= tick <= last:
+                high = tick
+                best = tick
+    return best
+
+def run_events(grid, maxIterations, deadline=None):
+    """Run grid like MessengerGrid.run, waking each message only when it
+    lands on a cell that does something or meets another message.
+    Ticks are counted exactly as MessengerGrid.run counts them.
+    Once more than MAX_FLIGHTS messages are travelling, the rest of the
+    ticks are run by MessengerGrid._run_ticks.
+    deadline is a time.perf_counter() value to stop at, or None.
+    """
+    if grid.segments is None:
+        grid.segments = SegmentTable(grid)
+    segments = grid.segments
+    limit = max(maxIterations, 1) if maxIterations else 0
+    order = itertools.count()
+    queue = [] # (tick, order, _Flight)
+    inFlight = {} # Used as an ordered set
+    now = 0
+
+    def launch(message):
+        """Send message along its Segment, waking up any message it
+        meets on the way at the tick they meet.
+        """
+        flight = _Flight(message,
+                         segments.segment(message.x, message.y, message.dir),
+                         now)
+        for other in inFlight:
+            tick = first_meeting(flight.segment, now,
+                                 other.segment, other.start,
+                                 now + 1, min(flight.end, other.end))
+            if tick is not None:
+                flight.end = tick
+                if tick < other.end:
+                    other.end = tick
+                    heapq.heappush(queue, (tick, next(order), other))
+        inFlight[flight] = None
+        heapq.heappush(queue, (flight.end, next(order), flight))
+
+    def land(flight):
+        """Put the message of flight where it is on tick now and return
+        it.
+        """
+        message = flight.message
+        if now > flight.start:
+            x, y, direction = flight.segment.position(now - flight.start)
+            opcode = grid.opcodes[(y + 1) * grid.stride + x + 1]
+            if OP_UP <= opcode <= OP_LEFT:
+                direction = opcode - OP_UP
+            message.x, message.y, message.dir = x, y, direction
+        return message
+
+    grid.tickNumber = 0
+    for m in grid.movingMessages:
+        launch(m)
+    try:
+        while inFlight:
+            if len(inFlight) > MAX_FLIGHTS:
+                break
+            tick, _, flight = heapq.heappop(queue)
+            if flight not in inFlight or tick != flight.end: # Outdated
+                continue
+            if limit and tick > limit:
+                now = limit
+                grid.tickNumber = limit
+                raise IterationLimitError(limit)
+            # Wake every message that lands on this tick
+            batch = [flight]
+            while queue and queue[0][0] == tick:
+                _, _, flight = heapq.heappop(queue)
+                if flight in inFlight and tick == flight.end:
+                    batch.append(flight)
+            now = tick
+            arriving = []
+            for flight in batch:
+                del inFlight[flight]
+                m = flight.message
+                x, y, direction = flight.segment.position(tick - flight.start)
+                # Put the message 1 unit before the cell so
+                # MessengerGrid._advance moves it there
+                m.x = x - DX[direction]
+                m.y = y - DY[direction]
+                m.dir = direction
+                arriving.append(m)
+            grid.tickNumber = tick - 1
+            survivors = grid._settle(*grid._advance(arriving))
+            grid.tickNumber = tick
+            for m in survivors:
+                launch(m)
+            if limit and tick >= limit:
+                raise IterationLimitError(tick)
+            if deadline and time.perf_counter() >= deadline:
+                raise TimeoutError(f'Timed out after {tick} iterations')
+        else: # Every message was trapped or left the grid
+            return
+    finally:
+        grid.movingMessages = [land(flight) for flight in inFlight]
+    grid.tickNumber = now
+    grid._run_ticks(maxIterations, deadline)
@@ -0,0 +1,227 @@
+"""Run Messenger code as a stream of output events, with or without
+asyncio.
+
+stream(grid, maxIterations) is a generator that yields an OutputEvent as
+soon as a message leaves the grid, and an 'error' event instead of
+raising if the code fails. astream is the same as an async generator: it
+runs the code in slices of ticks, letting the event loop run everything
+else between them, and awaits the input for I. This lets one process
+host lots of programs at once without a thread for each of them.
+"""
+
+import asyncio
+import collections
+import inspect
+import time
+
+from messenger.inputs import convert_input
+from messenger.interpreter import IterationLimitError
+from messenger.output import OutputSink
+
+### OUTPUTEVENT CLASS ###
+
+class OutputEvent:
+    """Something that happened while Messenger code ran.
+    kind is 'right' for a message that left the grid by its right edge,
+    'bottom' for one that left by the bottom edge, 'text' for output
+    that was written without an edge, or 'error' if the code failed.
+    tick is the tick it happened on, text is what was printed (or the
+    error message), and value is the content of the message (or the
+    exception).
+    """
+
+    __slots__ = ('kind', 'tick', 'text', 'value')
+
+    def __init__(self, kind, tick, text, value=None):
+        """Return an OutputEvent."""
+        self.kind = kind
+        self.tick = tick
+        self.text = text
+        self.value = value
+
+    def __repr__(self):
+        """Return a string representation of the OutputEvent."""
+        return (f'OutputEvent({self.kind!r}, {self.tick}, {self.text!r}, '
+                f'{self.value!r})')
+
+    def __eq__(self, other):
+        """Return True if other is the same OutputEvent."""
+        if not isinstance(other, OutputEvent):
+            return NotImplemented
+        return ((self.kind, self.tick, self.text, self.value)
+                == (other.kind, other.tick, other.text, other.value))
+
+### EVENTSINK CLASS ###
+
+class EventSink(OutputSink):
+    """Output kept as OutputEvents until they are taken."""
+
+    def __init__(self):
+        """Return an EventSink with no events."""
+        super().__init__(bufferSize=0)
+        self.events = []
+        self.tick = 0 # Stamped on each event
+
+    def write_edge(self, edge, content, text):
+        """Add an event for a message that left the grid."""
+        self.events.append(OutputEvent(edge, self.tick, text, content))
+
+    def emit(self, text):
+        """Add an event for output written without an edge."""
+        self.events.append(OutputEvent('text', self.tick, text))
+
+    def error(self, error):
+        """Add an event for error."""
+        self.events.append(OutputEvent('error', self.tick, str(error), error))
+
+    def take(self):
+        """Return the events so far and forget them."""
+        events = self.events
+        self.events = []
+        return events
+
+### STREAMING ###
+
+def _check_limits(grid, maxIterations, deadline):
+    """Raise an error if grid has run for too many ticks or too long."""
+    if maxIterations and grid.tickNumber >= maxIterations:
+        raise IterationLimitError(grid.tickNumber)
+    if deadline and time.perf_counter() >= deadline:
+        raise TimeoutError(f'Timed out after {grid.tickNumber} iterations')
+
+def stream(grid, maxIterations, timeLimit=None):
+    """Run grid 1 tick at a time like MessengerGrid.run, yielding an
+    OutputEvent for everything it prints as soon as it is printed.
+    Errors are yielded as an 'error' event, which is always the last.
+    """
+    deadline = time.perf_counter() + timeLimit if timeLimit else None
+    sink = EventSink()
+    output = grid.output
+    grid.output = sink
+    grid.tickNumber = 0
+    try:
+        while grid.movingMessages: # Some message isn't in a function
+            sink.tick = grid.tickNumber + 1
+            try:
+                grid.tick()
+                grid.tickNumber += 1
+                _check_limits(grid, maxIterations, deadline)
+            except Exception as error:
+                sink.error(error)
+                yield from sink.take()
+                return
+            if sink.events:
+                yield from sink.take()
+    finally:
+        grid.output = output
+
+### ASYNCIO ###
+
+class AsyncQueueInput:
+    """Input for astream that is added while the code runs. Reading
+    waits until a value is added. Each value can be an int, a list, or
+    a string to be parsed.
+    """
+
+    def __init__(self, values=()):
+        """Return an AsyncQueueInput holding values."""
+        self.values = collections.deque(values)
+        self.ended = False
+        self.changed = asyncio.Event()
+
+    def __repr__(self):
+        """Return a string representation of the AsyncQueueInput."""
+        return f'<AsyncQueueInput with {len(self.values)} values left>'
+
+    def __len__(self):
+        """Return the number of values that haven't been read yet."""
+        return len(self.values)
+
+    def add(self, *values):
+        """Add values to the end of the queue."""
+        self.values.extend(values)
+        self.changed.set()
+
+    def end(self):
+        """Stop waiting for more values once the queue is empty."""
+        self.ended = True
+        self.changed.set()
+
+    async def read(self, kind):
+        """Wait for the next value, remove it from the queue, and return
+        it.
+        """
+        while not self.values:
+            if self.ended:
+                raise EOFError('Ran out of input')
+            self.changed.clear()
+            await self.changed.wait()
+        return convert_input(self.values.popleft(), kind)
+
+async def _tick_async(grid, inputs):
+    """Run 1 tick of grid like MessengerGrid.tick, awaiting inputs.read
+    if it is a coroutine function.
+    """
+    arrivals, trapArrivals, waiting, printed, collisions, splits = (
+        grid._advance(grid.movingMessages)
+    )
+    # Anything wrong with the input is left for _settle to raise
+    if len(waiting) == 1 and waiting[0].content is not None:
+        m = waiting[0]
+        grid.output.flush()
+        kind = 'INT' if isinstance(m.content, int) else 'LIST'
+        value = inputs.read(kind)
+        if inspect.isawaitable(value):
+            value = await value
+        m.content = value
+        m.needsInput = False
+        waiting = []
+    grid.movingMessages = grid._settle(arrivals, trapArrivals, waiting,
+                                       printed, collisions, splits)
+
+async def astream(grid, maxIterations, inputs=None, sliceTicks=1000,
+                  timeLimit=None):
+    """Run grid like stream, as an async generator. The event loop gets
+    to run other tasks after every sliceTicks ticks.
+    inputs is where I gets its input from: anything with a read(kind)
+    method, which can be a coroutine function like AsyncQueueInput.read.
+    If it is None, the grid's own inputs are used.
+    """
+    deadline = time.perf_counter() + timeLimit if timeLimit else None
+    if inputs is None:
+        inputs = grid.inputs
+    sink = EventSink()
+    output = grid.output
+    grid.output = sink
+    grid.tickNumber = 0
+    try:
+        while grid.movingMessages: # Some message isn't in a function
+            sink.tick = grid.tickNumber + 1
+            try:
+                await _tick_async(grid, inputs)
+                grid.tickNumber += 1
+                _check_limits(grid, maxIterations, deadline)
+            except Exception as error:
+                sink.error(error)
+                for event in sink.take():
+                    yield event
+                return
+            for event in sink.take():
+                yield event
+            if grid.tickNumber % sliceTicks == 0:
+                await asyncio.sleep(0) # Let other tasks run
+    finally:
+        grid.output = output
+
+async def run_async(grid, maxIterations, inputs=None, sliceTicks=1000,
+                    timeLimit=None):
+    """Run grid like astream and return everything it printed as a
+    string, raising any error like MessengerGrid.run would.
+    """
+    parts = []
+    async for event in astream(grid, maxIterations, inputs, sliceTicks,
+                               timeLimit):
+        if event.kind == 'error':
+            raise event.value
+        parts.append(event.text)
+    return ''.join(parts)
@@ -0,0 +1,794 @@
+"""Record a run of Messenger code to a file and replay it later.
+
+A TraceRecorder passed to MessengerGrid.run writes a compact binary trace
+as the code runs. R gets a seeded random.Random, and every value T and I
+produce is written down, so nothing about the run is lost. The trace is
+streamed to the file with bounded memory: each tick only records what
+changed, since messages moving 1 unit and turning at redirectors is
+implied.
+
+Every snapshotInterval ticks, the whole state is written as a snapshot.
+A TraceReader seeks to any tick by loading the snapshot before it and
+applying the changes after it, without running any code.
+
+The file holds a header, then records, then a footer:
+    header     MAGIC, version, RNG seed, snapshot interval, and the
+               compiled grid from messenger.cache.dump
+    TICK       what changed in 1 tick, as a list of events
+    EMPTY      how many ticks in a row changed nothing else
+    SNAPSHOT   every message, the next message id, and the RNG state
+    END        the last tick, the error the run stopped with, and the
+               tick and offset of every snapshot
+    trailer    the offset of END and MAGIC again
+Numbers are unsigned LEB128 varints, and signed ones are zigzag-encoded
+first. A trace without a trailer (because the process was killed) can
+still be read; its records are just scanned to find the snapshots.
+"""
+
+import bisect
+import mmap
+import os
+import random
+import struct
+
+from messenger.cache import dump, load
+from messenger.inputs import InputProvider
+from messenger.interpreter import (MessengerMessage, OP_UP, OP_LEFT,
+                                   OP_RANDOM, OP_ADD, OP_GREATER)
+from messenger.lists import MessengerList
+from messenger.output import NullSink
+
+MAGIC = b'MSGT'
+FORMAT_VERSION = 1
+_TRAILER = struct.Struct('<Q4s')
+
+# Record types
+REC_TICK, REC_EMPTY, REC_SNAPSHOT, REC_END = range(1, 5)
+# Event types inside a TICK record
+(EV_DIE, EV_TURN, EV_CONTENT, EV_TRAPPED, EV_BIRTH, EV_MOVE, EV_ORDER,
+ EV_CLOCK, EV_INPUT, EV_OUTPUT) = range(1, 11)
+# Content tags
+_NULL, _INT, _LIST = range(3)
+EDGES = ('right', 'bottom', 'text')
+
+### ENCODING ###
+
+def _write_varint(buffer, number):
+    """Append the unsigned int number to buffer."""
+    while number >= 0x80:
+        buffer.append(number & 0x7f | 0x80)
+        number >>= 7
+    buffer.append(number)
+
+def _write_signed(buffer, number):
+    """Append the int number to buffer."""
+    _write_varint(buffer, number << 1 if number >= 0 else (-number << 1) - 1)
+
+def _write_content(buffer, content):
+    """Append the content of a message to buffer. LISTs are written as
+    their length and then their elements, without recursion, so deeply
+    nested LISTs don't hit the recursion limit.
+    """
+    if not isinstance(content, MessengerList):
+        if content is None:
+            buffer.append(_NULL)
+        else:
+            buffer.append(_INT)
+            _write_signed(buffer, content)
+        return
+    buffer.append(_LIST)
+    _write_varint(buffer, len(content))
+    stack = [iter(content)]
+    while stack:
+        for element in stack[-1]:
+            if isinstance(element, MessengerList):
+                buffer.append(_LIST)
+                _write_varint(buffer, len(element))
+                stack.append(iter(element))
+                break
+            elif element is None:
+                buffer.append(_NULL)
+            else:
+                buffer.append(_INT)
+                _write_signed(buffer, element)
+        else:
+            stack.pop()
+
+def _write_bytes(buffer, data):
+    """Append data to buffer, after its length."""
+    _write_varint(buffer, len(data))
+    buffer += data
+
+class _Cursor:
+    """A position in some bytes that values are read from."""
+
+    __slots__ = ('data', 'position')
+
+    def __init__(self, data, position=0):
+        """Return a _Cursor at position in data."""
+        self.data = data
+        self.position = position
+
+    def byte(self):
+        """Read 1 byte."""
+        self.position += 1
+        return self.data[self.position - 1]
+
+    def varint(self):
+        """Read an unsigned int."""
+        data = self.data
+        position = self.position
+        number = shift = 0
+        while True:
+            byte = data[position]
+            position += 1
+            number |= (byte & 0x7f) << shift
+            if byte < 0x80:
+                break
+            shift += 7
+        self.position = position
+        return number
+
+    def signed(self):
+        """Read an int."""
+        number = self.varint()
+        return -((number + 1) >> 1) if number & 1 else number >> 1
+
+    def content(self):
+        """Read the content of a message."""
+        tag = self.byte()
+        if tag != _LIST:
+            return None if tag == _NULL else self.signed()
+        stack = [([], self.varint())] # Elements so far, and how many
+        while True:
+            elements, length = stack[-1]
+            if len(elements) == length:
+                stack.pop()
+                value = MessengerList(elements)
+                if not stack:
+                    return value
+                stack[-1][0].append(value)
+                continue
+            tag = self.byte()
+            if tag == _LIST:
+                stack.append(([], self.varint()))
+            else:
+                elements.append(None if tag == _NULL else self.signed())
+
+    def bytes(self):
+        """Read bytes written after their length."""
+        length = self.varint()
+        self.position += length
+        return bytes(self.data[self.position - length:self.position])
+
+### TRACERECORDER CLASS ###
+
+class _TraceSink:
+    """An output sink that records everything written to it before
+    passing it on to the sink it wraps.
+    """
+
+    def __init__(self, sink, recorder):
+        """Return a _TraceSink wrapping sink."""
+        self.sink = sink
+        self.recorder = recorder
+
+    def write(self, text):
+        """Record text and write it."""
+        self.recorder._record_output(2, text)
+        self.sink.write(text)
+
+    def write_edge(self, edge, content, text):
+        """Record text and write it to the edge."""
+        self.recorder._record_output(EDGES.index(edge), text)
+        self.sink.write_edge(edge, content, text)
+
+    def flush(self):
+        """Flush the wrapped sink."""
+        self.sink.flush()
+
+class _TraceInput(InputProvider):
+    """An input provider that records every value it reads."""
+
+    def __init__(self, inputs, recorder):
+        """Return a _TraceInput wrapping inputs."""
+        self.inputs = inputs
+        self.recorder = recorder
+
+    def read(self, kind):
+        """Read the next input and record it."""
+        value = self.inputs.read(kind)
+        self.recorder.pending.append(EV_INPUT)
+        _write_content(self.recorder.pending, value)
+        return value
+
+class TraceRecorder:
+    """Records a run of a MessengerGrid to a binary trace file."""
+
+    def __init__(self, target, snapshotInterval=10000, seed=None):
+        """Return a TraceRecorder that writes to target, a path or a
+        binary file, with a snapshot every snapshotInterval ticks. R
+        uses a random.Random seeded with seed, which is random if it is
+        None.
+        """
+        self.target = target
+        self.snapshotInterval = snapshotInterval
+        self.seed = (int.from_bytes(os.urandom(8), 'little') if seed is None
+                     else seed)
+        self.file = None
+        self.offset = 0
+        self.pending = bytearray() # Events of the tick being run
+        self.known = {} # MessengerMessage: [id, index, direction,
+                        #                    content, trapped]
+        self.moving = [] # Ids of the moving messages, in order
+        self.nextId = 0
+        self.emptyTicks = 0
+        self.snapshots = [] # (tick, offset)
+
+    def __repr__(self):
+        """Return a string representation of the TraceRecorder."""
+        return f'<TraceRecorder with {len(self.snapshots)} snapshots>'
+
+    def _write(self, data):
+        """Write data to the file."""
+        self.file.write(data)
+        self.offset += len(data)
+
+    def _write_record(self, recordType, payload):
+        """Write a record of recordType holding payload."""
+        header = bytearray((recordType,))
+        _write_varint(header, len(payload))
+        self._write(header + payload)
+
+    def _flush_empty(self):
+        """Write the ticks in a row that changed nothing else."""
+        if self.emptyTicks:
+            record = bytearray((REC_EMPTY,))
+            _write_varint(record, self.emptyTicks)
+            self._write(record)
+            self.emptyTicks = 0
+
+    def _record_output(self, edge, text):
+        """Record text being printed by edge."""
+        self.pending.append(EV_OUTPUT)
+        self.pending.append(edge)
+        _write_bytes(self.pending, text.encode('utf-8'))
+
+    def run(self, grid, maxIterations, deadline=None):
+        """Run grid 1 tick at a time like MessengerGrid.run while
+        recording it.
+        """
+        originals = (grid.random, grid.clock, grid.inputs, grid.output)
+        grid.random = random.Random(self.seed)
+        originalClock = grid.clock
+
+        def clock():
+            value = originalClock()
+            self.pending.append(EV_CLOCK)
+            _write_signed(self.pending, value)
+            return value
+
+        grid.clock = clock
+        grid.inputs = _TraceInput(grid.inputs, self)
+        grid.output = _TraceSink(grid.output, self)
+        originalTick = grid.tick
+
+        def tick():
+            self.pending = bytearray()
+            originalTick()
+            self._record_tick(grid)
+            self.pending = bytearray()
+            if (grid.tickNumber + 1) % self.snapshotInterval == 0:
+                self._snapshot(grid, grid.tickNumber + 1)
+
+        grid.tick = tick
+        ownsFile = isinstance(self.target, (str, bytes, os.PathLike))
+        self.file = open(self.target, 'wb') if ownsFile else self.target
+        error = ''
+        try:
+            self._start(grid)
+            grid._run_ticks(maxIterations, deadline)
+        except BaseException as exception:
+            error = f'{type(exception).__name__}: {exception}'
+            raise
+        finally:
+            del grid.tick
+            grid.random, grid.clock, grid.inputs, grid.output = originals
+            try:
+                self._finish(grid, error)
+            finally:
+                if ownsFile:
+                    self.file.close()
+
+    def _start(self, grid):
+        """Write the header and a snapshot of grid as it is now."""
+        header = bytearray(MAGIC)
+        _write_varint(header, FORMAT_VERSION)
+        _write_signed(header, self.seed)
+        _write_varint(header, self.snapshotInterval)
+        _write_bytes(header, dump(grid))
+        self._write(header)
+        self.known = {}
+        self.moving = []
+        self.nextId = 0
+        self.snapshots = []
+        stride = grid.stride
+        for trapped, messages in ((False, grid.movingMessages),
+                                  (True, grid.occupancy.values())):
+            for m in messages:
+                self.known[m] = [self.nextId, (m.y + 1) * stride + m.x + 1,
+                                 m.dir, m.content, trapped]
+                if not trapped:
+                    self.moving.append(self.nextId)
+                self.nextId += 1
+        self._snapshot(grid, grid.tickNumber)
+
+    def _record_tick(self, grid):
+        """Record how the messages of grid changed in the last tick."""
+        stride = grid.stride
+        steps = (-stride, 1, stride, -1)
+        opcodes = grid.opcodes
+        events = self.pending
+        known = self.known
+        current = {}
+        births = []
+        order = []
+        for trapped, messages in ((False, grid.movingMessages),
+                                  (True, grid.occupancy.values())):
+            for m in messages:
+                index = (m.y + 1) * stride + m.x + 1
+                content = m._content
+                entry = known.get(m)
+                if entry is None: # Born this tick
+                    entry = [self.nextId, index, m.dir, content, trapped]
+                    self.nextId += 1
+                    births.append(entry[0])
+                    events.append(EV_BIRTH)
+                    _write_varint(events, index)
+                    events.append(m.dir | trapped << 2)
+                    _write_content(events, content)
+                else:
+                    (messageId, oldIndex, oldDirection, oldContent,
+                     wasTrapped) = entry
+                    expectedIndex = oldIndex
+                    expectedDirection = oldDirection
+                    if not wasTrapped: # It moved 1 unit
+                        expectedIndex += steps[oldDirection]
+                        opcode = opcodes[expectedIndex]
+                        if OP_UP <= opcode <= OP_LEFT:
+                            expectedDirection = opcode - OP_UP
+                    if index != expectedIndex:
+                        events.append(EV_MOVE)
+                        _write_varint(events, messageId)
+                        _write_varint(events, index)
+                    entry[1] = index
+                    if m.dir != expectedDirection:
+                        events.append(EV_TURN)
+                        _write_varint(events, messageId)
+                        events.append(m.dir)
+                    entry[2] = m.dir
+                    if content is not oldContent and (
+                        type(content) is not type(oldContent)
+                        or content != oldContent
+                    ):
+                        events.append(EV_CONTENT)
+                        _write_varint(events, messageId)
+                        _write_content(events, content)
+                    entry[3] = content
+                    if trapped != wasTrapped:
+                        events.append(EV_TRAPPED)
+                        _write_varint(events, messageId)
+                        events.append(trapped)
+                        entry[4] = trapped
+                current[m] = entry
+                if not trapped:
+                    order.append(entry[0])
+        for m, entry in known.items():
+            if m not in current:
+                events.append(EV_DIE)
+                _write_varint(events, entry[0])
+
+        # The order of the moving messages is only written down when it
+        # isn't the one TraceReader works out for itself
+        alive = {entry[0]: entry for entry in current.values()}
+        if order != _predict_order(self.moving, alive, births, opcodes):
+            events.append(EV_ORDER)
+            _write_varint(events, len(order))
+            for messageId in order:
+                _write_varint(events, messageId)
+        self.known = current
+        self.moving = order
+
+        if events:
+            self._flush_empty()
+            self._write_record(REC_TICK, events)
+        else:
+            self.emptyTicks += 1
+
+    def _snapshot(self, grid, tick):
+        """Write a snapshot of every message at tick."""
+        self._flush_empty()
+        payload = bytearray()
+        _write_varint(payload, tick)
+        _write_varint(payload, self.nextId)
+        version, internalState, gaussNext = grid.random.getstate()
+        _write_varint(payload, version)
+        _write_varint(payload, len(internalState))
+        for number in internalState:
+            _write_varint(payload, number)
+        if gaussNext is None:
+            payload.append(0)
+        else:
+            payload.append(1)
+            payload += struct.pack('<d', gaussNext)
+        entries = sorted(self.known.values(), key=lambda entry: entry[4])
+        byId = {entry[0]: entry for entry in entries}
+        _write_varint(payload, len(self.moving))
+        for messageId in self.moving:
+            _write_entry(payload, byId[messageId])
+        trapped = [entry for entry in entries if entry[4]]
+        _write_varint(payload, len(trapped))
+        for entry in trapped:
+            _write_entry(payload, entry)
+        self.snapshots.append((tick, self.offset))
+        self._write_record(REC_SNAPSHOT, payload)
+
+    def _finish(self, grid, error):
+        """Write the footer and the trailer."""
+        self._flush_empty()
+        payload = bytearray()
+        _write_varint(payload, grid.tickNumber)
+        _write_bytes(payload, error.encode('utf-8'))
+        # What was printed, input, or timed on the tick that failed
+        _write_bytes(payload, self.pending if error else b'')
+        _write_varint(payload, len(self.snapshots))
+        previousTick = previousOffset = 0
+        for tick, offset in self.snapshots: # Delta-encoded
+            _write_varint(payload, tick - previousTick)
+            _write_varint(payload, offset - previousOffset)
+            previousTick, previousOffset = tick, offset
+        footerOffset = self.offset
+        self._write_record(REC_END, payload)
+        self._write(_TRAILER.pack(footerOffset, MAGIC))
+        self.file.flush()
+
+def _write_entry(buffer, entry):
+    """Append a message's id, index, direction, and content to buffer."""
+    _write_varint(buffer, entry[0])
+    _write_varint(buffer, entry[1])
+    buffer.append(entry[2])
+    _write_content(buffer, entry[3])
+
+def _predict_order(moving, alive, births, opcodes):
+    """Return the order MessengerGrid.tick usually leaves the moving
+    messages in: the ones that moved on in their old order, then the
+    outputs of +-*/=G, then the new messages from splitters.
+    alive is a dictionary of every message still alive by id, whose
+    entries are [id, index, direction, content, trapped].
+    """
+    movedOn = []
+    results = []
+    for messageId in moving:
+        entry = alive.get(messageId)
+        if entry is None or entry[4]:
+            continue
+        if OP_ADD <= opcodes[entry[1]] <= OP_GREATER:
+            results.append(messageId)
+        else:
+            movedOn.append(messageId)
+    return movedOn + results + [messageId for messageId in births
+                                if not alive[messageId][4]]
+
+### TRACEREADER CLASS ###
+
+def _read_other_event(event, cursor):
+    """Read an event that doesn't change any messages and return it as
+    (kind, value), where kind is 'clock', 'input', or one of EDGES.
+    """
+    if event == EV_CLOCK:
+        return 'clock', cursor.signed()
+    elif event == EV_INPUT:
+        return 'input', cursor.content()
+    elif event == EV_OUTPUT:
+        edge = EDGES[cursor.byte()]
+        return edge, cursor.bytes().decode('utf-8')
+    raise ValueError(f'Invalid trace (unknown event {event})')
+
+class TraceState:
+    """The messages in a traced grid after some tick.
+    moving is a list of [id, index, direction, content] of the moving
+    messages in order, and trapped is a dictionary of the same for the
+    messages trapped in functions, by id. Indexes are in
+    MessengerGrid.opcodes.
+    """
+
+    def __init__(self, tick, nextId, moving, trapped, randomState,
+                 randomCalls):
+        """Return a TraceState."""
+        self.tick = tick
+        self.nextId = nextId
+        self.moving = moving
+        self.trapped = trapped
+        self.randomState = randomState # At the snapshot before tick
+        self.randomCalls = randomCalls # R landings since the snapshot
+
+    def __repr__(self):
+        """Return a string representation of the TraceState."""
+        return (f'<TraceState at tick {self.tick} with {len(self.moving)} '
+                f'moving and {len(self.trapped)} trapped messages>')
+
+class TraceReader:
+    """Reads a trace written by a TraceRecorder."""
+
+    def __init__(self, path):
+        """Return a TraceReader of the trace file at path."""
+        self.file = open(path, 'rb')
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        cursor = _Cursor(self.data)
+        if bytes(self.data[:4]) != MAGIC:
+            raise ValueError('Invalid trace (wrong format)')
+        cursor.position = 4
+        if cursor.varint() != FORMAT_VERSION:
+            raise ValueError('Invalid trace (wrong version)')
+        self.seed = cursor.signed()
+        self.snapshotInterval = cursor.varint()
+        self.grid = load(cursor.bytes(), NullSink())
+        self.recordsOffset = cursor.position
+        self._read_footer()
+
+    def __repr__(self):
+        """Return a string representation of the TraceReader."""
+        return f'<TraceReader of {self.ticks} ticks>'
+
+    def __enter__(self):
+        """Return the TraceReader."""
+        return self
+
+    def __exit__(self, *exception):
+        """Close the trace file."""
+        self.close()
+
+    def close(self):
+        """Close the trace file."""
+        self.data.close()
+        self.file.close()
+
+    def _read_footer(self):
+        """Find the last tick, the error, and the snapshots, from the
+        footer if there is one and by scanning the records otherwise.
+        """
+        data = self.data
+        if len(data) >= _TRAILER.size + self.recordsOffset:
+            footerOffset, magic = _TRAILER.unpack_from(
+                data, len(data) - _TRAILER.size
+            )
+            if magic == MAGIC and data[footerOffset] == REC_END:
+                cursor = _Cursor(data, footerOffset + 1)
+                cursor.varint() # Length
+                self.ticks = cursor.varint()
+                self.error = cursor.bytes().decode('utf-8') or None
+                length = cursor.varint()
+                self.failedEvents = (cursor.position,
+                                     cursor.position + length)
+                cursor.position += length
+                self.snapshots = []
+                tick = offset = 0
+                for _ in range(cursor.varint()):
+                    tick += cursor.varint()
+                    offset += cursor.varint()
+                    self.snapshots.append((tick, offset))
+                self.complete = True
+                return
+
+        # The trace was cut off, so scan it
+        self.snapshots = []
+        self.error = None
+        self.failedEvents = None
+        self.complete = False
+        tick = None
+        cursor = _Cursor(data, self.recordsOffset)
+        end = len(data)
+        try:
+            while cursor.position < end:
+                start = cursor.position
+                recordType = cursor.byte()
+                length = cursor.varint()
+                if recordType == REC_EMPTY:
+                    tick += length
+                    continue
+                if cursor.position + length > end:
+                    break
+                if recordType == REC_SNAPSHOT:
+                    tick = _Cursor(data, cursor.position).varint()
+                    self.snapshots.append((tick, start))
+                elif recordType == REC_TICK:
+                    tick += 1
+                cursor.position += length
+        except IndexError: # Cut off in the middle of a record
+            pass
+        if not self.snapshots:
+            raise ValueError('Invalid trace (no snapshots)')
+        self.ticks = tick
+
+    def _read_snapshot(self, offset):
+        """Return the TraceState of the snapshot at offset."""
+        cursor = _Cursor(self.data, offset + 1)
+        cursor.varint() # Length
+        tick = cursor.varint()
+        nextId = cursor.varint()
+        version = cursor.varint()
+        internalState = tuple(cursor.varint()
+                              for _ in range(cursor.varint()))
+        gaussNext = None
+        if cursor.byte():
+            gaussNext, = struct.unpack_from('<d', cursor.data,
+                                            cursor.position)
+            cursor.position += 8
+        moving = [self._read_entry(cursor) for _ in range(cursor.varint())]
+        trapped = {}
+        for _ in range(cursor.varint()):
+            entry = self._read_entry(cursor)
+            trapped[entry[0]] = entry
+        return TraceState(tick, nextId, moving, trapped,
+                          (version, internalState, gaussNext), 0)
+
+    @staticmethod
+    def _read_entry(cursor):
+        """Read a message's id, index, direction, and content."""
+        return [cursor.varint(), cursor.varint(), cursor.byte(),
+                cursor.content()]
+
+    def _records(self, offset):
+        """Yield (recordType, cursor, length) for each record from
+        offset on, with cursor at the start of its payload.
+        """
+        data = self.data
+        cursor = _Cursor(data, offset)
+        while cursor.position < len(data):
+            recordType = cursor.byte()
+            length = cursor.varint()
+            start = cursor.position
+            yield recordType, cursor, length
+            if recordType == REC_END:
+                return
+            if recordType != REC_EMPTY:
+                cursor.position = start + length
+
+    def _walk(self, tick):
+        """Yield the TraceState after every tick from the snapshot
+        before tick on, along with the events of that tick that don't
+        change any messages.
+        """
+        index = bisect.bisect_right(self.snapshots, (tick, float('inf'))) - 1
+        if index < 0 or tick > self.ticks:
+            raise ValueError(f'Tick {tick} is not in the trace '
+                             f'(0 to {self.ticks})')
+        snapshotTick, offset = self.snapshots[index]
+        state = self._read_snapshot(offset)
+        yield state, []
+        grid = self.grid
+        stride = grid.stride
+        steps = (-stride, 1, stride, -1)
+        opcodes = grid.opcodes
+        records = self._records(offset)
+        next(records) # The snapshot itself
+        for recordType, cursor, length in records:
+            if recordType == REC_EMPTY:
+                for _ in range(length):
+                    self._apply(state, None, 0, steps, opcodes)
+                    yield state, []
+            elif recordType == REC_TICK:
+                events = self._apply(state, cursor, cursor.position + length,
+                                     steps, opcodes)
+                yield state, events
+            elif recordType == REC_END:
+                return
+            # Later snapshots are skipped; the deltas lead to the same state
+
+    def _apply(self, state, cursor, end, steps, opcodes):
+        """Apply 1 tick of events from cursor up to end to state, and
+        return the events that don't change any messages as a list of
+        (kind, value), where kind is 'clock', 'input', or one of EDGES.
+        """
+        alive = {}
+        for entry in state.moving:
+            entry[1] += steps[entry[2]]
+            opcode = opcodes[entry[1]]
+            if OP_UP <= opcode <= OP_LEFT:
+                entry[2] = opcode - OP_UP
+            elif opcode == OP_RANDOM:
+                state.randomCalls += 1
+            alive[entry[0]] = entry + [False]
+        for messageId, entry in state.trapped.items():
+            alive[messageId] = entry + [True]
+        births = []
+        order = None
+        other = []
+        while cursor is not None and cursor.position < end:
+            event = cursor.byte()
+            if event <= EV_TRAPPED: # The value is read after the id
+                entry = alive[cursor.varint()]
+            if event == EV_DIE:
+                del alive[entry[0]]
+            elif event == EV_TURN:
+                entry[2] = cursor.byte()
+            elif event == EV_CONTENT:
+                entry[3] = cursor.content()
+            elif event == EV_TRAPPED:
+                entry[4] = bool(cursor.byte())
+            elif event == EV_BIRTH:
+                index = cursor.varint()
+                flags = cursor.byte()
+                entry = [state.nextId, index, flags & 3, cursor.content(),
+                         bool(flags & 4)]
+                alive[state.nextId] = entry
+                births.append(state.nextId)
+                state.nextId += 1
+            elif event == EV_MOVE:
+                entry = alive[cursor.varint()]
+                entry[1] = cursor.varint()
+            elif event == EV_ORDER:
+                order = [cursor.varint() for _ in range(cursor.varint())]
+            else:
+                other.append(_read_other_event(event, cursor))
+        if order is None:
+            order = _predict_order([entry[0] for entry in state.moving],
+                                   alive, births, opcodes)
+        state.moving = [alive[messageId][:4] for messageId in order]
+        state.trapped = {messageId: entry[:4]
+                         for messageId, entry in alive.items() if entry[4]}
+        state.tick += 1
+        return other
+
+    def state_at(self, tick):
+        """Return the TraceState after tick, found from the snapshot
+        before it without running any code.
+        """
+        for state, _ in self._walk(tick):
+            if state.tick == tick:
+                return state
+
+    def events_at(self, tick):
+        """Return what happened on tick that didn't change any messages,
+        as a list of (kind, value): the times T gave ('clock'), the
+        inputs I read ('input'), and what was printed ('right',
+        'bottom', or 'text'). If the run failed, the tick after the last
+        one has what happened before the error.
+        """
+        if tick == self.ticks + 1 and self.failedEvents:
+            cursor = _Cursor(self.data, self.failedEvents[0])
+            events = []
+            while cursor.position < self.failedEvents[1]:
+                events.append(_read_other_event(cursor.byte(), cursor))
+            return events
+        if not 0 < tick <= self.ticks:
+            raise ValueError(f'Tick {tick} is not in the trace '
+                             f'(1 to {self.ticks})')
+        # The events are in the record before the snapshot at tick, if
+        # there is one, so start from the snapshot before tick - 1
+        for state, events in self._walk(tick - 1):
+            if state.tick == tick:
+                return events
+
+    def grid_at(self, tick):
+        """Return a new MessengerGrid in the state it was in after tick,
+        which can carry on running with the same R choices as the traced
+        run.
+        """
+        state = self.state_at(tick)
+        grid = load(dump(self.grid))
+        stride = grid.stride
+        message = lambda entry, trapped: MessengerMessage(
+            entry[1] % stride - 1, entry[1] // stride - 1, entry[2], entry[3],
+            grid, trapped
+        )
+        grid.movingMessages = [message(entry, False)
+                               for entry in state.moving]
+        grid.occupancy = {entry[1]: message(entry, True)
+                          for entry in state.trapped.values()}
+        grid.tickNumber = state.tick
+        grid.random = random.Random()
+        grid.random.setstate(state.randomState)
+        for _ in range(state.randomCalls):
+            grid.random.choice([-1, 1])
+        return grid
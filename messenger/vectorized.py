@@ -0,0 +1,338 @@
+"""A NumPy engine for Messenger grids with huge numbers of messages.
+
+The moving messages are kept in NumPy arrays instead of MessengerMessage
+objects: their positions in the padded opcode array, their directions,
+the type of their content, and the content itself. Every tick moves them
+all at once and looks up the cells they land on with fancy indexing.
+Only R, L, T, I, B, E, the functions +-*/=G, and printing are run 1
+message at a time, and the results come out in exactly the same order
+as MessengerGrid.tick would give them.
+
+Each tick costs a few dozen NumPy calls however few messages there are,
+so this is only faster than the 'tick' engine once there are thousands
+of messages at once.
+"""
+
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    raise ImportError("The 'numpy' engine needs NumPy to be installed "
+                      '(pip install numpy)') from None
+
+from messenger.analysis import at_start
+from messenger.interpreter import (IterationLimitError, MessengerMessage,
+                                   OPCODE_CHARS, OP_SPACE, OP_UP, OP_LEFT,
+                                   OP_RANDOM, OP_WHILE, OP_NULL, OP_LIST,
+                                   OP_TIME, OP_DIGIT, OP_INPUT, OP_SPLIT,
+                                   OP_BEGIN, OP_END, OP_ADD, OP_VANISH,
+                                   OP_PRINT_RIGHT, OP_PRINT_BOTTOM)
+from messenger.lists import MessengerList
+
+# Content types, in the order of TYPE_NAMES
+NULL, INT, LIST = range(3)
+TYPE_NAMES = ('NULL', 'INT', 'LIST')
+
+def _type_of(content):
+    """Return NULL, INT, or LIST for content."""
+    if content is None:
+        return NULL
+    elif isinstance(content, MessengerList):
+        return LIST
+    else:
+        return INT
+
+def _object_array(values):
+    """Return a NumPy array of the objects in values. MessengerLists are
+    stored as they are instead of being turned into more arrays.
+    """
+    array = np.empty(len(values), dtype=object)
+    for i, value in enumerate(values):
+        array[i] = value
+    return array
+
+### MESSAGEARRAYS CLASS ###
+
+class MessageArrays:
+    """Moving messages stored as NumPy arrays, in the same order as
+    MessengerGrid.movingMessages.
+    """
+
+    __slots__ = ('index', 'direction', 'type', 'content')
+
+    def __init__(self, index, direction, contentType, content):
+        """Return MessageArrays of messages at the given indexes of the
+        padded opcode array, with the given directions, content types,
+        and contents.
+        """
+        self.index = index
+        self.direction = direction
+        self.type = contentType
+        self.content = content
+
+    def __len__(self):
+        """Return the number of messages."""
+        return len(self.index)
+
+    def __repr__(self):
+        """Return a string representation of the MessageArrays."""
+        return f'<MessageArrays of {len(self)} messages>'
+
+    @classmethod
+    def from_messages(cls, messages, stride):
+        """Return MessageArrays of a list of MessengerMessages."""
+        return cls(np.array([(m.y + 1) * stride + m.x + 1 for m in messages],
+                            dtype=np.int64),
+                   np.array([m.dir for m in messages], dtype=np.int64),
+                   np.array([_type_of(m.content) for m in messages],
+                            dtype=np.int8),
+                   _object_array([m.content for m in messages]))
+
+    @classmethod
+    def concatenate(cls, parts):
+        """Return MessageArrays of the messages in parts, in order."""
+        if len(parts) == 1:
+            return parts[0]
+        return cls(np.concatenate([part.index for part in parts]),
+                   np.concatenate([part.direction for part in parts]),
+                   np.concatenate([part.type for part in parts]),
+                   np.concatenate([part.content for part in parts]))
+
+    def take(self, positions):
+        """Return MessageArrays of the messages at positions."""
+        return MessageArrays(self.index[positions], self.direction[positions],
+                             self.type[positions], self.content[positions])
+
+    def to_messages(self, grid):
+        """Return the messages as a list of MessengerMessages in grid."""
+        stride = grid.stride
+        return [MessengerMessage(index % stride - 1, index // stride - 1,
+                                 direction, content, grid, False)
+                for index, direction, content
+                in zip(self.index.tolist(), self.direction.tolist(),
+                       self.content)]
+
+### ENGINE ###
+
+def opcode_lookup(grid):
+    """Return a function that takes a NumPy array of indexes in the
+    padded opcode array of grid and returns an array of their opcodes.
+    """
+    if not grid.sparse:
+        return np.frombuffer(grid.opcodes, dtype=np.uint8).take
+    stride = grid.stride
+    # No message can land on the cells the analysis found to be dead, but
+    # that only holds for messages that started in the top-left corner
+    cells = grid.analysis.cells if at_start(grid) else None
+    if cells is None: # Unknown, so keep every cell
+        cells = grid.opcodes
+    cells = np.array(sorted(cells), dtype=np.int64)
+    stored = np.array([grid.opcodes[cell] for cell in cells.tolist()],
+                      dtype=np.uint8)
+
+    def lookup(index):
+        y, x = np.divmod(index, stride)
+        opcodes = np.full(len(index), OP_SPACE, dtype=np.uint8)
+        opcodes[x == stride - 1] = OP_PRINT_RIGHT
+        opcodes[x == 0] = OP_VANISH
+        opcodes[y > grid.height] = OP_PRINT_BOTTOM
+        opcodes[y == 0] = OP_VANISH
+        if len(cells):
+            found = np.minimum(np.searchsorted(cells, index), len(cells) - 1)
+            isStored = cells[found] == index
+            opcodes[isStored] = stored[found[isStored]]
+        return opcodes
+
+    return lookup
+
+def vector_tick(grid, messages, lookup, steps):
+    """Run 1 tick of grid, whose moving messages are messages, and return
+    MessageArrays of the messages still moving afterwards.
+    lookup is opcode_lookup(grid), and steps is how far each direction
+    moves a message in the padded opcode array.
+    Errors are raised in the same order as MessengerGrid._settle raises
+    them, and messages isn't changed if one is.
+    """
+    stride = grid.stride
+    index = messages.index + steps[messages.direction]
+    direction = messages.direction.copy()
+    contentType = messages.type.copy()
+    content = messages.content.copy()
+    op = lookup(index)
+    counts = np.bincount(op, minlength=OP_PRINT_BOTTOM + 1)
+
+    # Run the cells the messages landed on
+    if counts[OP_UP:OP_LEFT + 1].any():
+        at = (op >= OP_UP) & (op <= OP_LEFT)
+        direction[at] = op[at] - OP_UP
+    if counts[OP_RANDOM]:
+        for i in np.flatnonzero(op == OP_RANDOM).tolist():
+            direction[i] = (direction[i] + grid.random.choice([-1, 1])) % 4
+    if counts[OP_WHILE]:
+        at = np.flatnonzero(op == OP_WHILE)
+        truthy = contentType[at] == LIST
+        ints = contentType[at] == INT
+        if ints.any():
+            truthy[ints] = content[at[ints]] > 0
+        direction[at] = (direction[at] + np.where(truthy, -1, 1)) % 4
+    if counts[OP_NULL]:
+        at = op == OP_NULL
+        content[at] = None
+        contentType[at] = NULL
+    if counts[OP_LIST]:
+        at = np.flatnonzero(op == OP_LIST)
+        for i in at.tolist():
+            content[i] = MessengerList((content[i],))
+        contentType[at] = LIST
+    if counts[OP_TIME]:
+        at = np.flatnonzero(op == OP_TIME)
+        for i in at.tolist():
+            content[i] = grid.clock()
+        contentType[at] = INT
+    if counts[OP_DIGIT:OP_DIGIT + 10].any():
+        at = np.flatnonzero((op >= OP_DIGIT) & (op < OP_DIGIT + 10))
+        content[at] = (op[at] - OP_DIGIT).astype(object)
+        contentType[at] = INT
+
+    # Find the messages that stay on the grid without entering +-*/=G.
+    # 2 messages on the same ' ' destroy each other, so only the last of
+    # an odd number of them is left, but anything else can only take 1.
+    # crowded is the position of the 1st message to break that rule.
+    stay = np.flatnonzero(op < OP_ADD)
+    crowded = None
+    if len(stay) > 1:
+        cells = index[stay]
+        order = np.argsort(cells, kind='stable')
+        sortedCells = cells[order]
+        repeats = sortedCells[1:] == sortedCells[:-1]
+        if repeats.any():
+            starts = np.flatnonzero(np.concatenate(([True], ~repeats)))
+            sizes = np.diff(np.append(starts, len(sortedCells)))
+            space = op[stay[order[starts]]] == OP_SPACE
+            keep = np.where(space, starts + sizes - 1, starts)
+            keep = keep[~space | (sizes % 2 == 1)]
+            full = starts[~space & (sizes > 1)]
+            if len(full):
+                crowded = int(stay[order[full + 1]].min())
+            stay = np.sort(stay[order[keep]])
+
+    # Messages entering +-*/=G become MessengerMessages, since they are
+    # either trapped or combined with the message already there
+    trapArrivals = {}
+    collisions = [] # (position, 1st argument, opcode, 2nd argument)
+    if counts[OP_ADD:OP_VANISH].any():
+        occupancy = grid.occupancy
+        for i in np.flatnonzero((op >= OP_ADD) & (op < OP_VANISH)).tolist():
+            cell = int(index[i])
+            if cell in trapArrivals:
+                if crowded is None or i < crowded:
+                    crowded = i
+                continue
+            m = MessengerMessage(cell % stride - 1, cell // stride - 1,
+                                 int(direction[i]), content[i], grid, True)
+            trapArrivals[cell] = m
+            if cell in occupancy:
+                collisions.append((i, occupancy[cell], int(op[i]), m))
+
+    # Get input if necessary
+    if counts[OP_INPUT] == 1:
+        i = int(np.flatnonzero(op == OP_INPUT)[0])
+        if contentType[i] == NULL:
+            raise TypeError("Can't input as type NULL")
+        grid.output.flush() # Show everything printed before asking
+        value = grid.inputs.read(TYPE_NAMES[contentType[i]])
+        content[i] = value
+        contentType[i] = _type_of(value)
+    elif counts[OP_INPUT] > 1:
+        raise RuntimeError(f"{counts[OP_INPUT]} inputs can't "
+                           f'happen at the same time')
+
+    # Print messages that escaped from the program
+    printed = int(counts[OP_PRINT_RIGHT] + counts[OP_PRINT_BOTTOM])
+    if printed:
+        if printed > 1:
+            raise RuntimeError(f"{printed} messages can't be "
+                               f'printed at the same time')
+        i = int(np.flatnonzero(op >= OP_PRINT_RIGHT)[0])
+        cell = int(index[i])
+        grid._print(MessengerMessage(cell % stride - 1, cell // stride - 1,
+                                     int(direction[i]), content[i], grid,
+                                     False))
+
+    # Run +-*/=G on the functions that got their 2nd message
+    results = []
+    for i, firstArgument, opcode, secondArgument in collisions:
+        if crowded is not None and crowded < i:
+            break
+        secondArgument.content = grid._evaluate(firstArgument, opcode,
+                                                secondArgument)
+        secondArgument.release()
+        results.append(secondArgument)
+    if crowded is not None:
+        raise RuntimeError("Two messages can't go into a "
+                           'function at the same time')
+    if trapArrivals:
+        occupancy = grid.occupancy
+        for cell, m in trapArrivals.items():
+            if m.inFunc: # Wait for a 2nd message
+                occupancy[cell] = m
+            else: # Its 1st message was used up
+                del occupancy[cell]
+
+    # Run B, E, and S (splitters). The message on the splitter becomes
+    # the left output and a new message is the right output.
+    parts = []
+    splits = np.flatnonzero((op >= OP_SPLIT) & (op <= OP_END))
+    if len(splits):
+        rightContent = content[splits]
+        rightType = contentType[splits]
+        for j in np.flatnonzero(op[splits] != OP_SPLIT).tolist():
+            i = int(splits[j])
+            if contentType[i] != LIST:
+                raise TypeError(f"Can't calculate "
+                                f'{TYPE_NAMES[contentType[i]]} '
+                                f'{OPCODE_CHARS[op[i]]}')
+            value = content[i]
+            if op[i] == OP_BEGIN: # Left: (...)[0], right: (...)[1:]
+                left = value[0] if value else None
+                rightContent[j] = value[1:]
+            else: # Left: (...)[-1], right: (...)[:-1]
+                left = value[-1] if value else None
+                rightContent[j] = value[:-1]
+            content[i] = left
+            contentType[i] = _type_of(left)
+            rightType[j] = LIST
+        parts.append(MessageArrays(index[splits],
+                                   (direction[splits] + 1) % 4,
+                                   rightType, rightContent))
+        direction[splits] = (direction[splits] - 1) % 4
+
+    if results:
+        parts.insert(0, MessageArrays.from_messages(results, stride))
+    moved = MessageArrays(index, direction, contentType, content)
+    parts.insert(0, moved if len(stay) == len(moved) else moved.take(stay))
+    return MessageArrays.concatenate(parts)
+
+def run_vectorized(grid, maxIterations, deadline=None):
+    """Run grid like MessengerGrid.run, moving all of its messages at
+    once with NumPy. Ticks are counted exactly as MessengerGrid.run
+    counts them.
+    deadline is a time.perf_counter() value to stop at, or None.
+    """
+    stride = grid.stride
+    lookup = opcode_lookup(grid)
+    steps = np.array([-stride, 1, stride, -1], dtype=np.int64)
+    messages = MessageArrays.from_messages(grid.movingMessages, stride)
+    grid.tickNumber = 0
+    try:
+        while len(messages): # Some message isn't in a function
+            messages = vector_tick(grid, messages, lookup, steps)
+            grid.tickNumber += 1
+            if maxIterations and grid.tickNumber >= maxIterations:
+                raise IterationLimitError(grid.tickNumber)
+            if deadline and time.perf_counter() >= deadline:
+                raise TimeoutError(f'Timed out after {grid.tickNumber} '
+                                   f'iterations')
+    finally:
+        grid.movingMessages = messages.to_messages(grid)
@@ -0,0 +1,53 @@
+"""Random Messenger code and a way to run it repeatably, for comparing
+two ways of running the same code.
+"""
+
+import random
+
+from messenger.interpreter import MessengerGrid
+from messenger.output import CaptureSink
+
+CHARS = (' ' * 30 + '<>^v' * 4 + 'S' * 3 + '0123456789' + 'WW' + '+-*/=G'
+         + 'BE' + 'L' + 'N')
+INPUTS = ['3', '-2', '0', '[1, 2]', '[]', '7'] * 20
+
+def random_code(rng, extra='', width=10, height=7):
+    """Return random Messenger code, with extra added to the characters
+    it is made of.
+    """
+    chars = CHARS + extra
+    rows = [''.join(rng.choice(chars)
+                    for _ in range(rng.randint(0, width)))
+            for _ in range(rng.randint(1, height))]
+    rows[0] = rng.choice('>v') + rows[0][1:]
+    return '\n'.join(rows)
+
+def make_grid(code, seed=0, **kwargs):
+    """Return a MessengerGrid of code that captures its output, reads
+    INPUTS, and always gets the same choices from R and times from T.
+    """
+    grid = MessengerGrid(code, CaptureSink(), list(INPUTS), **kwargs)
+    prepare(grid, seed)
+    return grid
+
+def prepare(grid, seed=0):
+    """Make R and T in grid repeatable and capture its output."""
+    grid.output = CaptureSink()
+    grid.random = random.Random(seed)
+    grid.clock = lambda: 1234567
+
+def state(grid):
+    """Return every message in grid as a sorted list of tuples."""
+    return sorted((m.x, m.y, m.dir if not m.inFunc else None,
+                   repr(m.content)) for m in grid.messages)
+
+def outcome(grid, maxIterations, **kwargs):
+    """Run grid and return what it printed, the error it raised as
+    (type name, message) or None, and how many ticks it ran.
+    """
+    try:
+        grid.run(maxIterations, **kwargs)
+        error = None
+    except Exception as exception:
+        error = (type(exception).__name__, str(exception))
+    return grid.output.getvalue(), error, grid.tickNumber
@@ -0,0 +1,54 @@
+"""Tests for messenger.batch."""
+
+import os
+import time
+
+from messenger import batch
+
+JOBS = [{'id': 'print', 'code': 'v\n1\n>  >'},
+        {'id': 'input', 'code': '>0I  ', 'inputs': [5]},
+        {'id': 'error', 'code': '>2B'},
+        {'id': 'loop', 'code': '>v\n^<', 'iterations': 100}]
+
+def _run_job(job, **settings):
+    """Run job like run_job, except that a job with the id 'crash' kills
+    its worker and one with the id 'hang' never finishes.
+    """
+    if job['id'] == 'crash':
+        os._exit(3)
+    if job['id'] == 'hang':
+        time.sleep(60)
+    return batch.run_job(job, **settings)
+
+def test_results_in_order():
+    """Results come back in the same order as the jobs, with or without
+    worker processes.
+    """
+    jobs = JOBS * 5
+    expected = [batch.run_job(job) for job in jobs]
+    assert [result['reason'] for result in expected[:4]] == [
+        'halted', 'halted', 'error', 'iteration-limit'
+    ]
+    assert expected[0]['output'] == '1'
+    for workers in (0, 1, 3):
+        assert list(batch.run_batch(jobs, workers)) == expected
+
+def test_crashes_and_hangs(monkeypatch):
+    """A job that kills its worker or runs past its time limit in a
+    single tick gets a result of its own, and the other jobs carry on.
+    """
+    monkeypatch.setattr(batch, 'HARD_LIMIT_GRACE', 0.2)
+    jobs = ([{'id': 'crash', 'code': '>'}]
+            + JOBS
+            + [{'id': 'hang', 'code': '>', 'timeLimit': 0.1}]
+            + JOBS)
+    start = time.monotonic()
+    results = list(batch.run_batch(jobs, 2, _run_job))
+    assert time.monotonic() - start < 30
+    assert [result['id'] for result in results] == [job['id']
+                                                    for job in jobs]
+    assert results[0]['reason'] == 'crash'
+    assert results[0]['error'] == 'Worker exited with code 3'
+    assert results[5]['reason'] == 'timeout'
+    expected = [batch.run_job(job) for job in JOBS]
+    assert results[1:5] == results[6:] == expected
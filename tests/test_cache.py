@@ -0,0 +1,126 @@
+"""Tests for messenger.cache."""
+
+import os
+
+from messenger import cache
+from messenger.interpreter import MessengerGrid
+from messenger.output import CaptureSink
+from tests.helpers import outcome, prepare
+
+# Code big enough to be cached, which prints 1
+BIG_CODE = 'v\n1\n>' + ' ' * cache.CACHE_MIN_SIZE + '>'
+
+def test_dump_and_load():
+    """A grid loaded from its compiled form runs the same way."""
+    for sparse in (False, True):
+        grid = MessengerGrid('v  <\n>1S+\n  >2^', sparse=sparse)
+        loaded = cache.load(cache.dump(grid))
+        assert loaded.rows() == grid.rows()
+        assert loaded.sparse == grid.sparse
+        assert loaded.opcodeSet == grid.opcodeSet
+        assert loaded._analysis is None # Not worked out yet
+        for g in (grid, loaded):
+            prepare(g)
+        assert outcome(loaded, 100) == outcome(grid, 100)
+
+def test_analysis_is_only_stored_when_known():
+    """dump doesn't analyse the grid, but keeps an Analysis it has."""
+    grid = MessengerGrid('>v\n^<')
+    cache.dump(grid)
+    assert grid._analysis is None
+    analysis = grid.analysis
+    loaded = cache.load(cache.dump(grid))
+    assert loaded._analysis.opcodes == analysis.opcodes
+    assert loaded._analysis.loop == analysis.loop
+    assert loaded._analysis.canOutput == analysis.canOutput
+
+def test_hit_and_miss(tmp_path):
+    """Code is compiled and stored the first time, and fetched after."""
+    directory = str(tmp_path)
+    grid = cache.cached_grid(BIG_CODE, CaptureSink(), directory=directory)
+    assert len(os.listdir(directory)) == 1
+    key = cache.cache_key(BIG_CODE.encode(), None)
+    fetched = cache.fetch(key, directory=directory)
+    assert fetched is not None and fetched.rows() == grid.rows()
+    again = cache.cached_grid(BIG_CODE, CaptureSink(), directory=directory)
+    again.run(0)
+    assert again.output.getvalue() == '1'
+    assert cache.clear(directory) == 1
+    assert cache.fetch(key, directory=directory) is None
+
+def test_small_code_is_not_cached(tmp_path):
+    """Code smaller than CACHE_MIN_SIZE never touches the cache."""
+    directory = str(tmp_path)
+    grid = cache.cached_grid('>1', CaptureSink(), directory=directory)
+    grid.run(0)
+    assert grid.output.getvalue() == '1'
+    assert os.listdir(directory) == []
+
+def test_invalidation(tmp_path):
+    """Different code, sparseness, or format versions get different
+    keys, and unreadable cache files are ignored.
+    """
+    directory = str(tmp_path)
+    code = BIG_CODE.encode()
+    assert cache.cache_key(code) != cache.cache_key(code + b' ')
+    assert cache.cache_key(code) != cache.cache_key(code, True)
+    key = cache.cache_key(code)
+    cache.store(key, MessengerGrid(BIG_CODE), directory)
+    path = os.path.join(directory, f'{key}.msgc')
+    with open(path, 'r+b') as file:
+        file.seek(4)
+        file.write(b'\xff\xff') # A format version that doesn't exist
+    assert cache.fetch(key, directory=directory) is None
+    with open(path, 'wb') as file:
+        file.write(b'MSGC garbage')
+    assert cache.fetch(key, directory=directory) is None
+    grid = cache.cached_grid(BIG_CODE, CaptureSink(), directory=directory)
+    grid.run(0)
+    assert grid.output.getvalue() == '1'
+    assert cache.fetch(key, directory=directory) is not None
+
+def test_cached_file(tmp_path):
+    """cached_file reads regular files and pipes."""
+    directory = str(tmp_path / 'cache')
+    path = tmp_path / 'code.msgr'
+    path.write_text(BIG_CODE)
+    for _ in range(2):
+        grid = cache.cached_file(path, CaptureSink(), directory=directory)
+        grid.run(0)
+        assert grid.output.getvalue() == '1'
+    assert len(os.listdir(directory)) == 1
+    read, write = os.pipe()
+    with os.fdopen(write, 'w') as file:
+        file.write('>  3')
+    try:
+        grid = cache.cached_file(f'/dev/fd/{read}', CaptureSink(),
+                                 directory=directory)
+    finally:
+        os.close(read)
+    grid.run(0)
+    assert grid.output.getvalue() == '3'
+
+def test_analysis_is_cached(tmp_path):
+    """cached_grid and cached_file store the Analysis, so grids fetched
+    from the cache don't have to work it out again.
+    """
+    directory = str(tmp_path / 'cache')
+    spaces = ' ' * cache.CACHE_MIN_SIZE
+    code = f'>{spaces}v\n^{spaces}<' # A big redirector loop
+    path = tmp_path / 'code.msgr'
+    path.write_text(BIG_CODE)
+    expected = {code: MessengerGrid(code).analysis,
+                BIG_CODE: MessengerGrid(BIG_CODE).analysis}
+    for _ in range(2):
+        grids = {code: cache.cached_grid(code, directory=directory),
+                 BIG_CODE: cache.cached_file(path, directory=directory)}
+        for source, grid in grids.items():
+            assert grid._analysis is not None
+            assert grid._analysis.opcodes == expected[source].opcodes
+            assert grid._analysis.loop == expected[source].loop
+            assert grid._analysis.canOutput == expected[source].canOutput
+    for name in os.listdir(directory):
+        with open(os.path.join(directory, name), 'rb') as file:
+            fetched = cache.load(file.read())
+        assert fetched._analysis is not None
+    assert grids[code]._analysis.loop is not None
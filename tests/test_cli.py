@@ -0,0 +1,33 @@
+"""Tests for messenger.cli."""
+
+import json
+
+import pytest
+
+from messenger.cli import main
+
+@pytest.mark.parametrize('arguments', [['-e', 'event'], ['-e', 'numpy'],
+                                       ['-l'], ['--trace', 'trace.msgt']])
+def test_profile_conflicts(arguments, tmp_path, capsys):
+    """Options that can't be used with --profile are rejected before
+    anything runs, and no profile is written.
+    """
+    path = tmp_path / 'profile.json'
+    with pytest.raises(SystemExit) as error:
+        main(['>1', '--no-cache', '--profile', str(path)] + arguments)
+    assert error.value.code == 2
+    assert 'error:' in capsys.readouterr().err
+    assert not path.exists()
+
+def test_profile_is_written(tmp_path, capsys):
+    """The profile is written after a run that halts, but not after one
+    that fails.
+    """
+    path = tmp_path / 'profile.json'
+    main(['>  1', '--no-cache', '--profile', str(path)])
+    assert capsys.readouterr().out == '1'
+    assert json.loads(path.read_text())['ticks'] == 4
+    path.unlink()
+    with pytest.raises(TypeError):
+        main(['>2B', '--no-cache', '--profile', str(path)])
+    assert not path.exists()
@@ -0,0 +1,127 @@
+"""Tests for messenger.cycles."""
+
+import random
+
+import pytest
+
+from messenger.analysis import Analysis
+from messenger.interpreter import (RIGHT, InfiniteLoopError,
+                                   IterationLimitError, MessengerMessage)
+from messenger.streaming import EventSink
+from tests.helpers import make_grid, outcome, random_code, state
+
+def test_matches_running_every_tick():
+    """Cycle detection prints the same and leaves the grid in the same
+    state as running every tick, or stops early with an
+    InfiniteLoopError where running every tick would hit the limit.
+    """
+    rng = random.Random(6)
+    loops = 0
+    for seed in range(400):
+        code = random_code(rng)
+        try:
+            expected = make_grid(code)
+        except ValueError:
+            continue
+        grid = make_grid(code)
+        expectedResult = outcome(expected, 500)
+        result = outcome(grid, 500, detectCycles=True)
+        if result[1] and result[1][0] == 'InfiniteLoopError':
+            loops += 1
+            assert expectedResult[1][0] == 'IterationLimitError', code
+            assert expectedResult[0].startswith(result[0])
+            continue
+        assert result == expectedResult, code
+        assert state(grid) == state(expected), code
+    assert loops
+
+def test_starts_from_current_state():
+    """A grid that has already run is checked from where it is now, not
+    from the start of the code.
+    """
+    rng = random.Random(60)
+    codes = ['v >v\n>1S<\n  >']
+    while len(codes) < 30:
+        code = random_code(rng)
+        try:
+            expected = make_grid(code)
+        except ValueError:
+            continue
+        if outcome(expected, 200)[1] == ('IterationLimitError',
+                                         'Ran for 200 iterations without '
+                                         'terminating'):
+            codes.append(code)
+    for code in codes:
+        for first in (1, 7, 13):
+            expected = make_grid(code)
+            grid = make_grid(code)
+            for g in (expected, grid):
+                with pytest.raises(IterationLimitError):
+                    g.run(first)
+                g.output.clear()
+            result = outcome(grid, 60, detectCycles=True)
+            expectedResult = outcome(expected, 60)
+            if result[1][0] == 'InfiniteLoopError':
+                assert expectedResult[0].startswith(result[0])
+                continue
+            assert result == expectedResult, code
+            assert state(grid) == state(expected), code
+
+def test_silent_loop():
+    """Code that loops without printing raises an InfiniteLoopError."""
+    grid = make_grid('>1v\n^ <')
+    with pytest.raises(InfiniteLoopError):
+        grid.run(10 ** 9, detectCycles=True)
+
+def test_random_after_moving():
+    """Code whose R can only be reached by messages that didn't start in
+    the top-left corner isn't treated as deterministic.
+    """
+    results = []
+    for detectCycles in (False, True):
+        grid = make_grid('<\n\n >  Rv\n >  ^<\n')
+        grid.movingMessages = [MessengerMessage(0, 2, RIGHT, None, grid,
+                                                False)]
+        results.append(outcome(grid, 1000, detectCycles=detectCycles))
+    assert results[0] == results[1] == ('', None, 47)
+
+def test_skipped_loops():
+    """Code found to end up in a ring of redirectors is skipped, and
+    stops in the same state as running it would.
+    """
+    rng = random.Random(17)
+    codes = ['>1v\n^ <', '>1v\n^N<', '>L1N2v\n   >2v\n   ^ <',
+             '>L v\n  >v\n  ^<', 'v\n>v\n^<']
+    while len(codes) < 40:
+        code = random_code(rng).translate({ord(char): None
+                                           for char in 'SW+-*/=GBE'})
+        if make_grid(code).analysis.loop is not None:
+            codes.append(code)
+    assert make_grid('>2Lv\n^ N<').analysis.loop is None # L in the ring
+    for code in codes:
+        for maxIterations in (1, 2, 3, 5, 50, 0):
+            grid = make_grid(code)
+            expected = make_grid(code)
+            analysis = expected.analysis
+            expected._analysis = Analysis(analysis.opcodes,
+                                          analysis.canOutput)
+            result = outcome(grid, maxIterations, detectCycles=True)
+            assert result == outcome(expected, maxIterations,
+                                     detectCycles=True), code
+            assert state(grid) == state(expected), code
+
+def test_skipped_output_keeps_edges():
+    """Output written for the ticks a printing cycle skips goes through
+    write_edge like it does when the ticks are run.
+    """
+    for code in ('vN  \nSS \n ^ \n6 G \nLv 9 ', 'v\n   v v\nS0 S\n\n W0-v '):
+        results = []
+        for detectCycles in (False, True):
+            grid = make_grid(code)
+            grid.output = EventSink()
+            with pytest.raises(IterationLimitError):
+                grid.run(300, detectCycles=detectCycles)
+            results.append([(event.kind, event.text, repr(event.value))
+                            for event in grid.output.take()])
+        assert {kind for kind, _, _ in results[0]} == {'right', 'bottom'}
+        assert results[0] == results[1]
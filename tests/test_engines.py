@@ -0,0 +1,72 @@
+"""Tests that the event and NumPy engines run code exactly like the tick
+engine.
+"""
+
+import random
+
+import pytest
+
+from benchmarks.programs import splitter_grid
+from messenger.interpreter import RIGHT, MessengerMessage
+from tests.helpers import make_grid, outcome, random_code, state
+
+ENGINES = ['event', 'numpy']
+
+def _compare(code, engine, maxIterations, seed=0):
+    """Check that engine runs code like the tick engine."""
+    try:
+        expected = make_grid(code, seed)
+    except ValueError:
+        return
+    grid = make_grid(code, seed)
+    result = outcome(grid, maxIterations, engine=engine)
+    assert result == outcome(expected, maxIterations), code
+    # Errors other than running out of ticks can happen halfway through
+    # moving the messages, which engines are free to do in any order
+    if result[1] is None or result[1][0] == 'IterationLimitError':
+        assert state(grid) == state(expected), code
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_random_code(engine):
+    """Random code, including R, T, and I, runs the same way."""
+    if engine == 'numpy':
+        pytest.importorskip('numpy')
+    rng = random.Random(5)
+    for seed in range(500):
+        _compare(random_code(rng, 'RIT'), engine, 300, seed)
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_big_random_code(engine):
+    """Bigger random code, with longer paths and more messages, runs the
+    same way.
+    """
+    if engine == 'numpy':
+        pytest.importorskip('numpy')
+    rng = random.Random(50)
+    for seed in range(60):
+        _compare(random_code(rng, 'RIT', 40, 30), engine, 1000, seed)
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_many_messages(engine):
+    """Code with hundreds of messages at once runs the same way, which
+    makes the event engine switch to running every tick.
+    """
+    if engine == 'numpy':
+        pytest.importorskip('numpy')
+    for maxIterations in (1, 150, 1000, 1001):
+        _compare(splitter_grid(400), engine, maxIterations)
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_sparse_after_moving(engine):
+    """Cells no message from the top-left corner can reach still run for
+    messages that started somewhere else.
+    """
+    if engine == 'numpy':
+        pytest.importorskip('numpy')
+    results = []
+    for name in ('tick', engine):
+        grid = make_grid('<\n\n >  7  ', sparse=True)
+        grid.movingMessages = [MessengerMessage(0, 2, RIGHT, None, grid,
+                                                False)]
+        results.append(outcome(grid, 100, engine=name))
+    assert results[0] == results[1] == ('7', None, 7)
@@ -0,0 +1,86 @@
+"""Tests for messenger.inputs."""
+
+import io
+
+import pytest
+
+from messenger.inputs import (QueueInput, StreamInput, convert_input,
+                              make_input, parse_input, parse_int, parse_list)
+from messenger.lists import MessengerList
+
+def test_parse_list():
+    """LISTs are parsed with any spacing, nesting, and case of NULL."""
+    cases = {
+        '[]': [],
+        '[ ]': [],
+        '  [1]  ': [1],
+        '[1,2,3]': [1, 2, 3],
+        '[ -1 ,\t2 ]': [-1, 2],
+        '[1, NULL, [2]]': [1, None, [2]],
+        '[null, Null]': [None, None],
+        '[[], [[]]]': [[], [[]]],
+        '[[1, [-2, []]], 3]': [[1, [-2, []]], 3],
+        '[007]': [7],
+    }
+    for text, expected in cases.items():
+        parsed = parse_list(text)
+        assert isinstance(parsed, MessengerList)
+        assert parsed.tolist() == expected, text
+
+def test_parse_deep_list():
+    """LISTs nested deeper than the recursion limit can be parsed."""
+    depth = 20000
+    parsed = parse_list('[' * depth + ']' * depth)
+    assert repr(parsed) == '[' * depth + ']' * depth
+
+@pytest.mark.parametrize('text', [
+    '', '1', 'NULL', '[', ']', '[1', '[1,]', '[,1]', '[1,,2]', '[1 2]',
+    '[1][2]', '[1] x', '[[1]', '[1]]', '[NUL]', '[1.5]', '[+1]', '[-]',
+    '[[1] [2]]',
+])
+def test_parse_invalid_list(text):
+    """Anything that isn't exactly 1 LIST is rejected."""
+    with pytest.raises(ValueError, match='Invalid LIST'):
+        parse_list(text)
+
+def test_parse_int():
+    """INTs are parsed like Python ints, and anything else is rejected."""
+    assert parse_int('42') == 42
+    assert parse_int(' -7 ') == -7
+    for text in ('', 'NULL', '1.5', '[1]', 'x'):
+        with pytest.raises(ValueError, match='Invalid INT'):
+            parse_int(text)
+    assert parse_input('3', 'INT') == 3
+    assert parse_input('[3]', 'LIST').tolist() == [3]
+
+def test_convert_input():
+    """Values that aren't strings are checked against the kind asked
+    for.
+    """
+    assert convert_input(5, 'INT') == 5
+    assert convert_input('5', 'INT') == 5
+    assert convert_input([1, None, (2,)], 'LIST').tolist() == [1, None, [2]]
+    for value, kind in ((True, 'INT'), (None, 'INT'), ([1], 'INT'),
+                        (5, 'LIST'), ([1.5], 'LIST'), ([True], 'LIST'),
+                        (['1'], 'LIST')):
+        with pytest.raises(ValueError):
+            convert_input(value, kind)
+
+def test_providers():
+    """Queues and streams hand out their values in order, then run
+    out.
+    """
+    queue = make_input(['1', [2], '[3]'])
+    assert isinstance(queue, QueueInput)
+    assert queue.read('INT') == 1
+    assert queue.read('LIST').tolist() == [2]
+    assert queue.read('LIST').tolist() == [3]
+    with pytest.raises(EOFError):
+        queue.read('INT')
+    stream = make_input(io.StringIO('4\n[NULL]\n'))
+    assert isinstance(stream, StreamInput)
+    assert stream.read('INT') == 4
+    assert stream.read('LIST').tolist() == [None]
+    with pytest.raises(EOFError):
+        stream.read('INT')
+    assert make_input('5\n6').read('INT') == 5
@@ -0,0 +1,63 @@
+"""Tests for messenger.interpreter."""
+
+import os
+import random
+import subprocess
+import sys
+
+from messenger.interpreter import MessengerGrid
+from messenger.output import CaptureSink
+from tests.helpers import make_grid, outcome, prepare, random_code, state
+
+def test_sparse_matches_dense():
+    """Sparse and dense grids run the same code the same way."""
+    rng = random.Random(14)
+    for seed in range(300):
+        code = random_code(rng, 'RIT')
+        try:
+            dense = make_grid(code, seed, sparse=False)
+        except ValueError:
+            continue
+        sparse = make_grid(code, seed, sparse=True)
+        assert sparse.sparse and not dense.sparse
+        assert sparse.rows() == dense.rows()
+        assert sparse.opcodeSet == dense.opcodeSet
+        assert outcome(sparse, 300) == outcome(dense, 300), code
+        assert state(sparse) == state(dense), code
+
+def test_from_file(tmp_path):
+    """Code read from a file runs like the same code given as a string,
+    and line breaks can be any of \\n, \\r\\n, and \\r.
+    """
+    rng = random.Random(140)
+    path = tmp_path / 'code.msgr'
+    for seed in range(100):
+        code = random_code(rng)
+        lineBreak = ('\n', '\r\n', '\r')[seed % 3]
+        path.write_bytes(code.replace('\n', lineBreak).encode())
+        expected = make_grid(code, seed)
+        grid = MessengerGrid.from_file(path, sparse=bool(seed % 2))
+        prepare(grid, seed)
+        assert grid.rows() == expected.rows()
+        assert outcome(grid, 200) == outcome(expected, 200)
+
+def test_from_file_reads_pipes():
+    """Files that can't be memory-mapped are read instead."""
+    read, write = os.pipe()
+    with os.fdopen(write, 'w') as file:
+        file.write('v\n1\n>  >')
+    try:
+        grid = MessengerGrid.from_file(f'/dev/fd/{read}', CaptureSink())
+    finally:
+        os.close(read)
+    grid.run(100)
+    assert grid.output.getvalue() == '1'
+
+def test_cli_reads_stdin():
+    """-f /dev/stdin works from the command line."""
+    result = subprocess.run(
+        [sys.executable, '-m', 'messenger', '-f', '/dev/stdin',
+         '--no-cache'],
+        input='>  5', capture_output=True, text=True, check=True
+    )
+    assert result.stdout == '5'
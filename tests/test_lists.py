@@ -0,0 +1,69 @@
+"""Tests for messenger.lists."""
+
+import operator
+
+import pytest
+
+from messenger.interpreter import IterationLimitError, MessengerGrid
+from messenger.lists import MessengerList
+from messenger.output import CaptureSink
+
+def nested(depth, innermost=None):
+    """Return a MessengerList nested depth levels deep."""
+    content = MessengerList(() if innermost is None else (innermost,))
+    for _ in range(depth - 1):
+        content = MessengerList((content,))
+    return content
+
+def test_matches_python_lists():
+    """MessengerLists print and compare like Python lists."""
+    pairs = [([], []), ([1], []), ([1, 2], [1, 3]), ([None], [None, 1]),
+             ([[1], 2], [[1], 3]), ([[1, [2]]], [[1, [2]]]),
+             ([[]], [[], []]), ([0], [[0]])]
+    for first, second in pairs:
+        a = MessengerList._copy_of(_convert(first), len(first))
+        b = MessengerList._copy_of(_convert(second), len(second))
+        assert repr(a) == repr(first)
+        assert a.tolist() == first
+        assert (a == b) == (first == second)
+        assert (a == second) == (first == second)
+        if first == second:
+            assert hash(a) == hash(b)
+        for compare in (operator.lt, operator.le, operator.gt,
+                        operator.ge):
+            try:
+                expected = compare(first, second)
+            except TypeError:
+                with pytest.raises(TypeError):
+                    compare(a, b)
+            else:
+                assert compare(a, b) == expected
+
+def _convert(elements):
+    """Return elements with any Python lists in it as MessengerLists."""
+    return [MessengerList(_convert(element)) if isinstance(element, list)
+            else element for element in elements]
+
+def test_deep_nesting():
+    """LISTs nested deeper than the recursion limit still work."""
+    depth = 20000
+    deep = nested(depth, 1)
+    other = nested(depth, 2)
+    assert repr(deep) == '[' * depth + '1' + ']' * depth
+    assert deep == nested(depth, 1)
+    assert deep != other
+    assert deep < other and other > deep
+    assert hash(deep) == hash(nested(depth, 1))
+    python = deep.tolist()
+    for _ in range(depth - 1):
+        python = python[0]
+    assert python == [1]
+
+def test_deeply_nested_output():
+    """Code that keeps wrapping a LIST in L prints as much as it used to
+    instead of hitting the recursion limit.
+    """
+    grid = MessengerGrid('v  <\n>L S\n   >', CaptureSink())
+    with pytest.raises(IterationLimitError):
+        grid.run(3000)
+    assert len(grid.output.getvalue()) == 142500
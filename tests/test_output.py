@@ -0,0 +1,42 @@
+"""Tests for messenger.output."""
+
+import io
+
+from messenger.inputs import InputProvider
+from messenger.interpreter import MessengerGrid
+from messenger.output import BytesSink
+
+class _Watcher(InputProvider):
+    """Input that remembers what had reached a stream whenever it was
+    read.
+    """
+
+    def __init__(self, stream):
+        """Return a _Watcher of stream."""
+        self.stream = stream
+        self.seen = []
+
+    def read(self, kind):
+        """Remember what is in the stream and return 5."""
+        self.seen.append(self.stream.getvalue())
+        return 5
+
+def test_bytes_sink_flushes_stream():
+    """A binary stream gets the output printed before an input is asked
+    for, not just the sink's own buffer.
+    """
+    raw = io.BytesIO()
+    inputs = _Watcher(raw)
+    grid = MessengerGrid('v\n >I \n721\nWS', io.BufferedWriter(raw), inputs)
+    grid.run(50)
+    assert inputs.seen == [b'\x07']
+    assert raw.getvalue() == b'\x075'
+
+def test_bytes_sink_bytearray():
+    """A bytearray, which can't be flushed, still gets the output."""
+    target = bytearray()
+    sink = BytesSink(target)
+    sink.write('h\xe9')
+    assert target == b''
+    sink.flush()
+    assert target == 'h\xe9'.encode('utf-8')
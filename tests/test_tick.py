@@ -0,0 +1,78 @@
+"""Tests for the tick engine, checked against what the interpreter
+printed and raised before ticks were fused into a single pass.
+"""
+
+import builtins
+
+import pytest
+
+from tests.helpers import make_grid
+
+# Code, what it printed, the name of the error it raised (or None), and
+# how many ticks it ran in 100 iterations, as recorded from the
+# interpreter that moved and settled one message at a time
+CASES = [
+    ('>      \n SL<  S\nWI',
+     'NULL', None, 7),
+    ('vvI \nS<^ 9 \n E<   *\n    S 4\n<^',
+     '', 'RuntimeError', 100),
+    ('>03 S> N\n\n<vG  \n= \n   \n /\n  Bv -+L3 ',
+     '\x03', None, 11),
+    ('><N<\n > S *1 vI\n *+vL^\n*v \n   < \n -',
+     '', 'RuntimeError', 100),
+    ('v \n < S 8^ v\n  G',
+     '', None, 3),
+    ('>9v  L \n8^v W4<\n> SE/  <W<\n> 9 1',
+     '', 'TypeError', 4),
+    ('>v   S   9\nSW+E1W^< S\n S\n/',
+     '', 'RuntimeError', 100),
+    ('>9 +\n  L<N =  v\n ^v=\n\nS    S\n>  GS^\n9 9   2',
+     '', None, 3),
+    ('><< 66 \n>1>N   S\n + 7   v ',
+     '', 'RuntimeError', 100),
+    ('v  W\n5W\nS \n= * E',
+     '5', None, 7),
+    ('v   \n  =  \n   86 v *\n> S \nE/>  >>  \n3N    N8\n    ',
+     'NULL', None, 13),
+    ('>\n N7',
+     'NULL', None, 3),
+    ('v  S  >\n  B\nvS 3>  W+\n G^ 0>',
+     '', None, 4),
+    ('v  \nSSv6 v+5> \nv   17\n= 8  \n-< IBv8-\n +/  G\n+ I8 >',
+     '', None, 6),
+    ('>9^^  +SI5\n\n\n\n v8',
+     '', None, 3),
+    ('vE==6 6 S=\n^2>9B < \nI^\n8 =',
+     '', 'RuntimeError', 100),
+    ('>L SL+0L\n 3\nG<',
+     '', 'TypeError', 5),
+    ('v   3Sv<v>\n >/ \n <9 I\n> I WI\n ',
+     '', 'TypeError', 4),
+    ('v+   \n G+ 0<\nvWI  5<3\n>^ 62S B \nG ^I<*',
+     '', 'TypeError', 5),
+    ('> S3>7   \n 1  S W   \n\nS<B ^ \nNI^  ^B v',
+     '', 'TypeError', 4),
+    ('v^ 4G3 \n    * 1S8>\nS <9  <\nv0^  \n69 S',
+     '\x06\x06\x06\x06\x06\x06\x06\x06\x06\x06\x06\x06', 'RuntimeError', 100),
+    ('v 1 /  8\n3\n 0 v4 6 \n +v  ^<\n   \nS>S*4=',
+     '\x03\x03\x03\x03\x031\x03\x03\x03'
+     '\x031\x03\x03\x03\x031\x03\x03\x03', 'RuntimeError', 100),
+    ('v  -3\n  88^>S\nS <N1 - \n7v <\n 5N N>>   \nG /8+vvW',
+     '\x00\x00\x00\x00\x00\x00', 'RuntimeError', 100),
+    ('vv vv\nSS4 2 \n\nvv+  ^ <S\nW \n> 4 >  ^v',
+     '222222222222222', 'RuntimeError', 100),
+]
+
+@pytest.mark.parametrize('code, printed, error, ticks', CASES)
+def test_matches_old_engine(code, printed, error, ticks):
+    """The fused tick pipeline prints, fails, and stops like the old
+    engine did.
+    """
+    grid = make_grid(code)
+    if error is None:
+        grid.run(100)
+    else:
+        with pytest.raises(getattr(builtins, error)):
+            grid.run(100)
+    assert grid.output.getvalue() == printed
+    assert grid.tickNumber == ticks
@@ -0,0 +1,129 @@
+"""Tests for messenger.trace, checked against running the same code 1
+tick at a time.
+"""
+
+import random
+
+import pytest
+
+from messenger.interpreter import IterationLimitError
+from messenger.trace import TraceReader, TraceRecorder
+from tests.helpers import make_grid, prepare, random_code, state
+
+SEED = 5
+PRINTED = ('right', 'bottom', 'text')
+# Code that runs forever and prints more the more often R turns left
+CODE = 'v \nS<1\nR\n8 '
+
+def expected_run(code, maxIterations):
+    """Run code the way a TraceRecorder with SEED would, and return the
+    state after each tick, what was printed on each tick, and the error
+    it stopped with as (type name, message) or None.
+    """
+    grid = make_grid(code)
+    grid.random = random.Random(SEED)
+    states = [state(grid)]
+    printed = []
+    error = None
+    while grid.movingMessages:
+        before = len(grid.output.getvalue())
+        try:
+            grid.tick()
+        except Exception as exception:
+            error = (type(exception).__name__, str(exception))
+        printed.append(grid.output.getvalue()[before:])
+        if error:
+            break
+        grid.tickNumber += 1
+        states.append(state(grid))
+        if grid.tickNumber >= maxIterations:
+            error = ('IterationLimitError',
+                     str(IterationLimitError(grid.tickNumber)))
+            break
+    return states, printed, error
+
+def record(code, path, maxIterations, snapshotInterval):
+    """Record code running to a trace at path."""
+    grid = make_grid(code)
+    recorder = TraceRecorder(str(path), snapshotInterval, SEED)
+    try:
+        grid.run(maxIterations, trace=recorder)
+    except Exception:
+        pass
+    return grid
+
+def printed_on(reader, tick):
+    """Return what the trace says was printed on tick."""
+    return ''.join(value for kind, value in reader.events_at(tick)
+                   if kind in PRINTED)
+
+def test_round_trip(tmp_path):
+    """Every tick of a trace can be replayed, including what was printed
+    on the tick that failed.
+    """
+    rng = random.Random(18)
+    for number in range(40):
+        code = random_code(rng, 'RRTI')
+        states, printed, error = expected_run(code, 150)
+        path = tmp_path / f'{number}.trace'
+        grid = record(code, path, 150, 7)
+        with TraceReader(str(path)) as reader:
+            assert reader.complete
+            assert reader.ticks == len(states) - 1 == grid.tickNumber
+            assert reader.error == (f'{error[0]}: {error[1]}' if error
+                                    else None)
+            for tick, expected in enumerate(states):
+                assert state(reader.grid_at(tick)) == expected, (code, tick)
+                traced = reader.state_at(tick)
+                assert traced.tick == tick
+                assert (len(traced.moving) + len(traced.trapped)
+                        == len(expected))
+            for tick in range(1, reader.ticks + 1):
+                assert printed_on(reader, tick) == printed[tick - 1]
+            if error and error[0] != 'IterationLimitError':
+                assert printed_on(reader, reader.ticks + 1) == printed[-1]
+            with pytest.raises(ValueError):
+                reader.events_at(0)
+
+def test_carry_on(tmp_path):
+    """A grid from a trace carries on running the same way, with the
+    same R choices.
+    """
+    path = tmp_path / 'run.trace'
+    original = record(CODE, path, 60, 16).output.getvalue()
+    with TraceReader(str(path)) as reader:
+        for tick in (0, 15, 16, 17, 40):
+            grid = reader.grid_at(tick)
+            choices = grid.random
+            prepare(grid)
+            grid.random = choices
+            with pytest.raises(IterationLimitError):
+                grid.run(60 - tick) # run counts from 0 again
+            before = ''.join(printed_on(reader, done)
+                             for done in range(1, tick + 1))
+            assert before + grid.output.getvalue() == original
+
+def test_cut_off(tmp_path):
+    """A trace cut off in the middle, like when the process is killed,
+    can still be read up to where it stops.
+    """
+    states, _, _ = expected_run(CODE, 200)
+    path = tmp_path / 'run.trace'
+    record(CODE, path, 200, 20)
+    data = path.read_bytes()
+    for size in (len(data) - 1, len(data) * 2 // 3, len(data) // 2):
+        cut = tmp_path / f'{size}.trace'
+        cut.write_bytes(data[:size])
+        with TraceReader(str(cut)) as reader:
+            assert not reader.complete
+            assert 0 < reader.ticks <= 200
+            assert reader.error is None
+            for tick in (0, reader.ticks // 2, reader.ticks):
+                assert state(reader.grid_at(tick)) == states[tick]
+
+def test_invalid(tmp_path):
+    """Files that aren't traces are rejected."""
+    path = tmp_path / 'bad.trace'
+    path.write_bytes(b'not a trace at all')
+    with pytest.raises(ValueError, match='wrong format'):
+        TraceReader(str(path))